@@ -1,62 +1,440 @@
+import hashlib
 import json
 import os
-import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
-from langchain_huggingface import HuggingFaceEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import metrics
+import prefilter
+from batching import chunk_tokens, estimate_tokens, fits, pack_reviews
+from store import topic_cache
+from taxonomy_store import TaxonomyStore
+from ann_index import HNSW_AVAILABLE, HnswTopicIndex, best_matches
+from embeddings import Embedder
+from scheduler import scheduler, is_rate_limit_error, get_retry_after
 
 load_dotenv()
 
 # Constants
-TAXONOMY_FILE = "taxonomy.json"
+TAXONOMY_FILE = "taxonomy.json" # Legacy format, migrated into TaxonomyStore on first load
 SIMILARITY_THRESHOLD = 0.78 # As per spec
+EXTRACTION_VERSION = 2 # Bump when counting semantics change; part of the taxonomy version
+TAXONOMY_INDEX_FILE = "taxonomy.hnsw"
+INDEX_BACKEND = os.environ.get("TAXONOMY_INDEX", "exact") # "exact" | "hnsw"
+# ANN settings from benchmarks/ann_recall.py (64-query batches): at ef 192, threshold decisions
+# agree with exact search on >= 99.7% of queries up to 100k topics, and ANN overtakes the exact
+# matmul between 40k and 50k topics
+ANN_MIN_TOPICS = int(os.environ.get("ANN_MIN_TOPICS", "50000")) # Below this, exact search is faster
+ANN_EF = int(os.environ.get("ANN_EF", "192")) # HNSW search breadth (recall vs. latency)
+ANN_CANDIDATES = int(os.environ.get("ANN_CANDIDATES", "10")) # ANN candidates re-scored exactly per query
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "1") == "1" # Classify known reviews by embedding
+FAST_PATH_THRESHOLD = float(os.environ.get("FAST_PATH_THRESHOLD", "0.85")) # Review-to-topic/exemplar cosine
+MAX_EXAMPLES_PER_TOPIC = 20 # Exemplars kept per topic (and for "no topic")
+EXTRACTION_WORKERS = 8 # Concurrent LLM calls; the scheduler keeps them under rate limits
+EST_OUTPUT_TOKENS = 200 # Budgeted completion tokens per call
+LLM_TIMEOUT = 60.0 # Seconds per HTTP request to Groq
+MAX_RETRY_WAIT = 20.0 # Seconds we will wait on a model's Retry-After before falling back
+MAX_RATE_LIMIT_RETRIES = 2
+DEFAULT_RETRY_AFTER = 5.0
 
 # --- 1. TAXONOMY & EMBEDDING MANAGER ---
 class TaxonomyManager:
-    def __init__(self, embedding_model_name="all-MiniLM-L6-v2"):
+    def __init__(self, embedding_model_name="all-MiniLM-L6-v2", index_backend=INDEX_BACKEND):
         self.taxonomy_path = TAXONOMY_FILE
+        self.store = TaxonomyStore()
+        self._base_index_path = TAXONOMY_INDEX_FILE
+        self.index_backend = index_backend
+        self._ann = None
+        self._lock = threading.RLock() # Concurrent analyses share this manager
         self.topics = {} # {topic_name: {examples: [], embedding: np.array, created_at: str}}
-        self.embedding_model = HuggingFaceEmbeddings(model_name=embedding_model_name)
+        self.revision = 0
+        self.embedding_model_name = embedding_model_name
+        # Backend (hf / onnx / int8), encoder processes and cache size come from EMBEDDING_* env vars
+        self.embedder = Embedder(embedding_model_name)
         self.load_taxonomy()
 
+    @property
+    def version(self) -> str:
+        """
+        Identifies the mapping behaviour of this taxonomy for caching daily counts.
+        Appending topics does NOT change it; edits and compactions bump `revision`.
+        """
+        fast_path = FAST_PATH_THRESHOLD if FAST_PATH_ENABLED else "off"
+        # A non-reference embedding backend maps slightly differently: its own cache entries
+        model = self.embedding_model_name if self.embedder.variant == "hf" else f"{self.embedding_model_name}:{self.embedder.variant}"
+        key = f"{model}|{SIMILARITY_THRESHOLD}|{EXTRACTION_VERSION}|{fast_path}|{self.revision}"
+        return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+    def bump_revision(self):
+        """Call after editing or compacting topics so cached daily counts are recomputed."""
+        # Atomic in the store, so concurrent bumps from several workers are not lost
+        self.revision = self.store.increment_meta("revision")
+        print(f"[TAXONOMY] Revision bumped to {self.revision} (version {self.version}).")
+
     def load_taxonomy(self):
-        if os.path.exists(self.taxonomy_path):
-            with open(self.taxonomy_path, "r") as f:
-                data = json.load(f)
-                # Restore numpy arrays from lists
-                for topic, details in data.items():
-                    details["embedding"] = np.array(details["embedding"])
-                self.topics = data
+        with self._lock:
+            self._load_taxonomy()
+
+    def _load_taxonomy(self):
+        # One-time migration from the legacy taxonomy.json format (once across all workers)
+        if self.store.count() == 0 and os.path.exists(self.taxonomy_path):
+            with self.store.transaction():
+                if self.store.count() == 0:
+                    self._migrate_json()
+
+        # One read snapshot, so topics, exemplars and version counters agree
+        with self.store.transaction(write=False):
+            self._epoch, self._generation, self.revision = self.store.get_versions()
+            topics, embeddings = self.store.load()
+            ex_topics, ex_vectors, self._ex_last_id = self.store.load_examples()
+            alias_names, alias_canonical, alias_vectors = self.store.load_merges()
+
+        self.topics = {
+            t["name"]: {
+                "examples": t["examples"],
+                "embedding": embeddings[i], # Row view into the memmap, not a copy
+                "created_at": t["created_at"]
+            }
+            for i, t in enumerate(topics)
+        }
+        if self.topics:
             print(f"[TAXONOMY] Loaded {len(self.topics)} topics.")
         else:
             print("[TAXONOMY] No existing taxonomy found. Starting fresh.")
-            self.topics = {}
+
+        # The memmap is the topic matrix until the first append copies it into a growable buffer
+        self._names = [t["name"] for t in topics]
+        self._row = {name: i for i, name in enumerate(self._names)}
+        self._size = len(self._names)
+        self._matrix = embeddings
+        self._build_ann()
+
+        # Topics merged away by compaction: their phrasings still map to the canonical topic
+        self._aliases = dict(zip(alias_names, alias_canonical))
+        self._alias_canonical = alias_canonical
+        self._alias_matrix = alias_vectors
+
+        # Labelled review exemplars for the embedding fast path
+        self._ex_topics = ex_topics
+        self._ex_size = len(ex_topics)
+        self._ex_matrix = ex_vectors
+        self._ex_count = {}
+        for t in ex_topics:
+            self._ex_count[t] = self._ex_count.get(t, 0) + 1
+
+    # --- Sharing the store with other workers ---
+    # The store is the source of truth: topics and exemplars are written through as they are
+    # added, and the in-memory matrices are read caches of rows [0, n) of the store.
+    def refresh(self) -> bool:
+        """
+        Brings the in-memory caches up to date with writes from other workers/processes.
+        Costs one small query when nothing changed. Returns True if anything was reloaded.
+        """
+        with self._lock:
+            epoch, generation, self.revision = self.store.get_versions()
+            if epoch != self._epoch:
+                print(f"[TAXONOMY] Store was rewritten (epoch {epoch}); reloading.")
+                self._load_taxonomy()
+                return True
+            if generation != self._generation:
+                self._load_tail()
+                return True
+            return False
+
+    def _reload_if_rewritten(self) -> bool:
+        """
+        Call inside a store write transaction before writing: if another worker rewrote the
+        store (compaction, migration) since our last read, reloads everything and returns
+        True. Names from before may then have been merged away; self._aliases maps them.
+        """
+        epoch = self.store.get_versions()[0]
+        if epoch == self._epoch:
+            return False
+        print(f"[TAXONOMY] Store was rewritten (epoch {epoch}); reloading before writing.")
+        self._load_taxonomy()
+        return True
+
+    def _load_tail(self):
+        """
+        Appends topics and exemplars other workers added since our last read. The epoch is
+        re-checked in the same read transaction: if a compaction committed since refresh()
+        looked, the new rows do not line up with our cache and everything is reloaded.
+        """
+        with self.store.transaction(write=False):
+            epoch, generation, revision = self.store.get_versions()
+            if epoch != self._epoch:
+                print(f"[TAXONOMY] Store was rewritten (epoch {epoch}); reloading.")
+                self._load_taxonomy()
+                return
+            self._generation, self.revision = generation, revision
+            topics, embeddings = self.store.load_since(self._size)
+            ex_topics, ex_vectors, self._ex_last_id = self.store.load_examples(after_id=self._ex_last_id)
+
+        for t, vector in zip(topics, embeddings if embeddings is not None else []):
+            self.topics[t["name"]] = {"examples": t["examples"], "embedding": vector, "created_at": t["created_at"]}
+            self._append_to_matrix(t["name"], np.asarray(vector, dtype=np.float32))
+        for topic, vector in zip(ex_topics, ex_vectors if ex_vectors is not None else []):
+            self._ex_matrix = _append_row(self._ex_matrix, self._ex_size, vector)
+            self._ex_topics.append(topic)
+            self._ex_size += 1
+            self._ex_count[topic] = self._ex_count.get(topic, 0) + 1
+
+    def _insert_topics(self, names: List[str], vectors: np.ndarray, dedupe: bool = True) -> Dict[str, str]:
+        """
+        Persists new topics under the store's write lock and adds them to the caches.
+        Inside the lock we first pull topics other workers inserted meanwhile; a name that now
+        exists, or (with dedupe) is within SIMILARITY_THRESHOLD of a freshly pulled topic, maps
+        to that topic instead of creating a near-duplicate. Returns {name: final topic name}.
+        """
+        resolved = {}
+        with self.store.transaction():
+            known = self._size
+            if self._reload_if_rewritten():
+                known = 0 # Everything was reloaded: dedupe against the whole taxonomy
+            else:
+                self._load_tail()
+            to_insert, to_insert_vectors = [], []
+            for name, vector in zip(names, vectors):
+                if name in self._aliases: # Merged away by a compaction
+                    resolved[name] = self._aliases[name]
+                    continue
+                if name in self.topics or name in resolved:
+                    resolved.setdefault(name, name)
+                    continue
+                if dedupe and self._size > known:
+                    scores = self._matrix[known:self._size] @ vector
+                    j = int(scores.argmax())
+                    if scores[j] >= SIMILARITY_THRESHOLD:
+                        resolved[name] = self._names[known + j]
+                        print(f"[TAXONOMY] '{name}' was just added by another worker as '{resolved[name]}'")
+                        continue
+                if dedupe:
+                    print(f"[NEW TOPIC] {name}")
+                resolved[name] = name
+                to_insert.append({"name": name, "examples": [name], "created_at": datetime.now().isoformat()})
+                to_insert_vectors.append(vector)
+
+            if to_insert:
+                start = self.store.append(to_insert, np.array(to_insert_vectors, dtype=np.float32))
+                if start != self._size:
+                    raise RuntimeError(f"Taxonomy cache out of sync: store row {start}, cache row {self._size}")
+                for topic, vector in zip(to_insert, to_insert_vectors):
+                    self.topics[topic["name"]] = {"examples": topic["examples"], "embedding": vector,
+                                                  "created_at": topic["created_at"]}
+                    self._append_to_matrix(topic["name"], vector)
+                self._generation = self.store.get_versions()[1]
+        return resolved
+
+    def _migrate_json(self):
+        """Runs inside a store write transaction."""
+        with open(self.taxonomy_path, "r") as f:
+            data = json.load(f)
+        topics = [
+            {"name": name, "examples": d["examples"], "created_at": d["created_at"]}
+            for name, d in data.items()
+        ]
+        vectors = _normalize(np.array([d["embedding"] for d in data.values()], dtype=np.float32))
+        self.store.rewrite(topics, vectors)
+        print(f"[TAXONOMY] Migrated {len(topics)} topics from {self.taxonomy_path}.")
 
     def save_taxonomy(self):
-        # Convert numpy arrays to lists for JSON serialization
-        serializable_topics = {}
-        for topic, details in self.topics.items():
-            serializable_topics[topic] = {
-                "examples": details["examples"],
-                "embedding": details["embedding"].tolist(),
-                "created_at": details["created_at"]
-            }
-        
-        # Backup
-        if os.path.exists(self.taxonomy_path):
-            shutil.copy(self.taxonomy_path, self.taxonomy_path + ".bak")
-            
-        with open(self.taxonomy_path, "w") as f:
-            json.dump(serializable_topics, f, indent=2)
+        with self._lock, metrics.span("taxonomy_save"):
+            self._save_taxonomy()
+
+    def _save_taxonomy(self):
+        """
+        Topics and exemplars are written through to the store as they are added; what is
+        left to persist is the ANN index (a cache rebuilt on load if it falls behind).
+        """
+        if self._ann is not None:
+            self._ann.save(self.index_path)
 
     def get_topic_embedding(self, text: str) -> np.ndarray:
-        return np.array(self.embedding_model.embed_query(text))
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embeds many strings in one call (cached by content hash). Returns an L2-normalized float32 (n, dim) matrix."""
+        if not texts:
+            return np.zeros((0, self._matrix.shape[1] if self._matrix is not None else 0), dtype=np.float32)
+        with metrics.span("embed_batch", texts=len(texts), backend=self.embedder.kind):
+            return self.embedder.embed(texts)
+
+    # --- Optional ANN index (TAXONOMY_INDEX=hnsw) ---
+    @property
+    def index_path(self) -> str:
+        """One index file per store epoch, so a compacted taxonomy never loads a stale index."""
+        if not self._epoch:
+            return self._base_index_path
+        root, ext = os.path.splitext(self._base_index_path)
+        return f"{root}.{self._epoch}{ext}"
+
+    @property
+    def _ann_enabled(self) -> bool:
+        return self.index_backend == "hnsw" and HNSW_AVAILABLE
+
+    def _build_ann(self):
+        """Loads the persisted HNSW index if it matches the taxonomy, else rebuilds it."""
+        self._ann = None
+        if self.index_backend == "hnsw" and not HNSW_AVAILABLE:
+            print("[WARN] TAXONOMY_INDEX=hnsw but hnswlib is not installed. Using exact search.")
+        if not self._ann_enabled or not self._size:
+            return
+
+        dim = self._matrix.shape[1]
+        if os.path.exists(self.index_path):
+            index = HnswTopicIndex.load(self.index_path, dim, ef=ANN_EF)
+            if len(index) == self._size:
+                self._ann = index
+                print(f"[TAXONOMY] Loaded ANN index ({len(index)} topics).")
+                return
+
+        print(f"[TAXONOMY] Building ANN index for {self._size} topics...")
+        self._ann = HnswTopicIndex(dim, max_elements=max(1024, self._size * 2), ef=ANN_EF)
+        self._ann.add(self._matrix[:self._size], start_label=0)
+
+    # --- Cached topic matrix ---
+    # Rows of self._matrix[:self._size] are the normalized embeddings of self._names, in order.
+    # Capacity doubles on growth so add_new_topic appends in place (amortized O(dim)).
+    def _append_to_matrix(self, topic_name: str, unit_embedding: np.ndarray):
+        self._matrix = _append_row(self._matrix, self._size, unit_embedding)
+        if self._ann_enabled:
+            if self._ann is None:
+                self._ann = HnswTopicIndex(unit_embedding.shape[0], ef=ANN_EF)
+            self._ann.add(unit_embedding, start_label=self._size)
+        self._names.append(topic_name)
+        self._row[topic_name] = self._size
+        self._size += 1
+
+    # --- Embedding fast path ---
+    def classify_reviews(self, texts: List[str], threshold: float = None) -> Tuple[np.ndarray, List[Tuple[bool, str]]]:
+        """
+        Embeds review texts in one batch and compares them with topic embeddings and
+        labelled review exemplars. Returns (vectors, labels) where labels[i] is
+        (confident, topic): confident reviews can be counted without the LLM; topic is
+        None for a confident "no complaint" match.
+        """
+        threshold = FAST_PATH_THRESHOLD if threshold is None else threshold
+        # Embed before taking the manager lock (the embedder has its own), so concurrent
+        # analyses only serialize on scoring, not on the model
+        vectors = self.embed_batch(texts)
+        with self._lock:
+            self.refresh()
+            best_scores = np.full(len(texts), -1.0)
+            best_topics = [None] * len(texts)
+
+            if self._size:
+                scores = vectors @ self._matrix[:self._size].T
+                idx = scores.argmax(axis=1)
+                best_scores = scores[np.arange(len(texts)), idx]
+                best_topics = [self._names[i] for i in idx]
+
+            if self._ex_size:
+                ex_scores = vectors @ self._ex_matrix[:self._ex_size].T
+                ex_idx = ex_scores.argmax(axis=1)
+                ex_best = ex_scores[np.arange(len(texts)), ex_idx]
+                for i in np.nonzero(ex_best > best_scores)[0]:
+                    best_scores[i] = ex_best[i]
+                    best_topics[i] = self._ex_topics[ex_idx[i]]
+
+            labels = [(bool(score >= threshold), topic) for score, topic in zip(best_scores, best_topics)]
+            return vectors, labels
+
+    def record_examples(self, topics: List[str], vectors: np.ndarray):
+        """
+        Stores LLM-labelled reviews (exactly one topic, or None for "no topic") as exemplars,
+        up to MAX_EXAMPLES_PER_TOPIC per label (per worker view; concurrent workers may
+        overshoot the cap slightly, which only costs a few extra rows).
+        """
+        with self._lock:
+            pending = {}
+            keep_topics, keep_vectors = [], []
+            for topic, vector in zip(topics, vectors):
+                if self._ex_count.get(topic, 0) + pending.get(topic, 0) >= MAX_EXAMPLES_PER_TOPIC:
+                    continue
+                pending[topic] = pending.get(topic, 0) + 1
+                keep_topics.append(topic)
+                keep_vectors.append(vector)
+            if not keep_topics:
+                return
+            # Written through, then read back with everything other workers added
+            with self.store.transaction():
+                if self._reload_if_rewritten():
+                    # Compacted meanwhile: label with the surviving topics, not merged-away names
+                    keep_topics = [self._aliases.get(t, t) if t is not None else None for t in keep_topics]
+                self.store.append_examples(keep_topics, keep_vectors)
+                self._load_tail()
+
+    def map_extracted_topics(self, raw_topics: List[str], add_new: bool = True) -> List[str]:
+        if not raw_topics:
+            return []
+        unique_raw = list(dict.fromkeys(raw_topics))
+        vectors = self.embed_batch(unique_raw) # Outside the lock, as in classify_reviews
+        with self._lock:
+            self.refresh()
+            return self._map_extracted_topics(raw_topics, unique_raw, vectors, add_new)
+
+    def _map_extracted_topics(self, raw_topics: List[str], unique_raw: List[str], vectors: np.ndarray,
+                              add_new: bool) -> List[str]:
+        """
+        Batch version of map_extracted_topic. Scores the embeddings (`vectors`, one row per
+        `unique_raw` topic) against the cached topic matrix with a single matrix multiply.
+        With add_new=True, unmatched topics are added to the taxonomy (reusing their embedding);
+        later phrases in the same batch can match them, and so can topics another worker
+        inserted concurrently (see _insert_topics).
+        Returns the mapped topic name for each raw topic, in order.
+        """
+        # (n_unique,) best existing match for every raw topic at once
+        if self._ann is not None and self._size >= ANN_MIN_TOPICS:
+            # ANN shortlist, then exact re-scoring so the threshold sees true cosine scores
+            candidates = self._ann.query(vectors, k=ANN_CANDIDATES)
+            best_idx, best_scores = best_matches(self._matrix, vectors, candidates)
+        elif self._size:
+            scores = vectors @ self._matrix[:self._size].T
+            best_idx = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(unique_raw)), best_idx]
+        else:
+            best_idx = np.zeros(len(unique_raw), dtype=int)
+            best_scores = np.full(len(unique_raw), -1.0)
+
+        # Aliases merged away by compaction count as their canonical topic
+        if self._alias_matrix is not None:
+            alias_scores = vectors @ self._alias_matrix.T
+            alias_idx = alias_scores.argmax(axis=1)
+            alias_best = alias_scores[np.arange(len(unique_raw)), alias_idx]
+
+        mapping = {}
+        new_names, new_rows = [], [] # New topics in this batch and their rows in `vectors`
+        for i, raw_topic in enumerate(unique_raw):
+            best_topic = self._names[best_idx[i]] if self._size else None
+            best_score = best_scores[i]
+            if self._alias_matrix is not None and alias_best[i] > best_score:
+                best_topic, best_score = self._alias_canonical[alias_idx[i]], alias_best[i]
+
+            # Topics new in this batch are not in `scores`; check them too
+            if new_rows:
+                added_scores = vectors[new_rows] @ vectors[i]
+                j = int(added_scores.argmax())
+                if added_scores[j] > best_score:
+                    best_topic, best_score = new_names[j], added_scores[j]
+
+            if best_topic is not None and best_score >= SIMILARITY_THRESHOLD:
+                mapping[raw_topic] = best_topic
+            else:
+                mapping[raw_topic] = raw_topic
+                if add_new and raw_topic not in self.topics:
+                    new_names.append(raw_topic)
+                    new_rows.append(i)
+
+        if new_names:
+            resolved = self._insert_topics(new_names, vectors[new_rows])
+            # Matches made before a compaction reload may name topics merged away since
+            mapping = {raw: resolved.get(topic, self._aliases.get(topic, topic)) for raw, topic in mapping.items()}
+
+        return [mapping[t] for t in raw_topics]
 
     def map_extracted_topic(self, raw_topic: str) -> str:
         """
@@ -65,42 +443,108 @@ class TaxonomyManager:
         """
         if not self.topics:
             return raw_topic
-        
-        raw_embedding = self.get_topic_embedding(raw_topic).reshape(1, -1)
-        
-        # Calculate similarity with all existing topics
-        existing_topics = list(self.topics.keys())
-        existing_embeddings = np.array([self.topics[t]["embedding"] for t in existing_topics])
-        
-        # Calculate cosine similarity
-        similarities = cosine_similarity(raw_embedding, existing_embeddings)[0]
-        
-        best_idx = np.argmax(similarities)
-        best_score = similarities[best_idx]
-        best_topic = existing_topics[best_idx]
-        
-        # print(f"[DEBUG] '{raw_topic}' vs '{best_topic}' score: {best_score:.3f}")
-        
-        if best_score >= SIMILARITY_THRESHOLD:
-            return best_topic
-        else:
-            return raw_topic
+        return self.map_extracted_topics([raw_topic], add_new=False)[0]
 
-    def add_new_topic(self, topic_name: str):
-        if topic_name not in self.topics:
-            emb = self.get_topic_embedding(topic_name)
-            self.topics[topic_name] = {
-                "examples": [topic_name],
-                "embedding": emb,
-                "created_at": datetime.now().isoformat()
-            }
+    # --- Compaction (see compaction.py) ---
+    def snapshot(self) -> Tuple[List[str], np.ndarray, str]:
+        """
+        Current topic names, a copy of their normalized embeddings (row i = names[i]) and
+        the taxonomy version they belong to, all read after one refresh.
+        """
+        with self._lock:
+            self.refresh()
+            if not self._size:
+                return [], np.zeros((0, 0), dtype=np.float32), self.version
+            return list(self._names), np.array(self._matrix[:self._size], dtype=np.float32), self.version
+
+    def apply_merges(self, merges: Dict[str, Tuple[str, float]]) -> Dict[str, Tuple[str, float]]:
+        """
+        Merges {alias: (canonical, similarity)} in one store transaction: aliases leave the
+        topic matrix, their names join the canonical topic's examples, and their embeddings
+        are kept in the merge table so raw topics close to them still map to the canonical.
+        Merges naming topics that no longer exist are skipped. Returns the merges applied.
+        """
+        with self._lock:
+            with self.store.transaction():
+                if not self._reload_if_rewritten():
+                    self._load_tail()
+                merges = {
+                    alias: (canonical, score) for alias, (canonical, score) in merges.items()
+                    if alias in self.topics and canonical in self.topics and alias != canonical
+                    and canonical not in merges
+                }
+                if not merges:
+                    return {}
+                aliases_of = {}
+                for alias, (canonical, _) in merges.items():
+                    aliases_of.setdefault(canonical, []).append(alias)
+
+                kept = [name for name in self._names if name not in merges]
+                topics = [
+                    {
+                        "name": name,
+                        "examples": self.topics[name]["examples"] + aliases_of.get(name, []),
+                        "created_at": self.topics[name]["created_at"]
+                    }
+                    for name in kept
+                ]
+                vectors = self._matrix[[self._row[name] for name in kept]]
+                alias_vectors = self._matrix[[self._row[alias] for alias in merges]]
+                self.store.merge_topics(topics, vectors, merges, alias_vectors, datetime.now().isoformat())
+            # New epoch: reload the compacted topics, aliases and relabelled exemplars
+            self._load_taxonomy()
+        print(f"[TAXONOMY] Merged {len(merges)} topic(s); {self._size} remain.")
+        return merges
+
+    def add_new_topic(self, topic_name: str, embedding: np.ndarray = None):
+        self.add_new_topics([topic_name], None if embedding is None else [embedding])
+
+    def add_new_topics(self, topic_names: List[str], embeddings: np.ndarray = None):
+        """Adds topics by name (no similarity merge) in one store transaction; existing names are skipped."""
+        vectors = self.embed_batch(topic_names) if embeddings is None else _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._insert_topics(topic_names, vectors, dedupe=False)
+
+def _append_row(matrix: np.ndarray, size: int, row: np.ndarray) -> np.ndarray:
+    """
+    Writes `row` at index `size`, doubling capacity when full (amortized O(dim)).
+    Read-only inputs (e.g. a memmap) are copied into a writable buffer on first growth.
+    Returns the (possibly new) matrix.
+    """
+    if matrix is None:
+        matrix = np.zeros((16, row.shape[0]), dtype=np.float32)
+    elif size == matrix.shape[0]:
+        grown = np.zeros((max(16, matrix.shape[0] * 2), matrix.shape[1]), dtype=np.float32)
+        grown[:size] = matrix[:size]
+        matrix = grown
+    matrix[size] = row
+    return matrix
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalizes vectors (1-D or row-wise 2-D) so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
 
 # --- 2. AGENT (GROQ) ---
+def _llm_outcome(error: Exception) -> str:
+    return "rate_limited" if is_rate_limit_error(error) else "error"
+
+class AllModelsFailed(Exception):
+    def __init__(self, message: str, over_budget: bool = False):
+        super().__init__(message)
+        self.over_budget = over_budget # Some models were skipped because the input exceeded their budget
+
 class Agent:
     def __init__(self):
         self.key = os.environ.get("GROQ_API_KEY")
         if not self.key:
             raise ValueError("GROQ_API_KEY not found in env")
+        
+        # Deferred imports: langchain is slow to import and only needed once the agent is used
+        import httpx
+        from langchain_groq import ChatGroq
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
             
         # Prioritized list of models to try
         self.models = [
@@ -113,12 +557,13 @@ class Agent:
         # Extraction Prompt
         self.extract_prompt = ChatPromptTemplate.from_template("""
         You are an AI that extracts user complaints and feature requests from reviews.
-        Return ONLY a JSON list of normalized topics (strings).
+        Return ONLY a JSON object mapping each review ID to a list of normalized topics (strings).
+        Use an empty list for reviews with no complaint or request.
         
         Reviews:
         {reviews_text}
         
-        Output format: ["Topic 1", "Topic 2"]
+        Output format: {{"1": ["Topic 1", "Topic 2"], "2": []}}
         """)
         
         # Insight Prompt
@@ -134,51 +579,152 @@ class Agent:
         Keep it concise and professional.
         """)
         
-    def _get_chain(self, model_name: str, prompt, output_parser):
-        """Creates a chain with the specified model."""
-        llm = ChatGroq(
-            temperature=0,
-            model_name=model_name,
-            groq_api_key=self.key
+        # Parsers are stateless; build them once
+        self._parser = JsonOutputParser()
+        self._str_parser = StrOutputParser()
+        
+        # One keep-alive HTTP pool shared by every model client
+        self._http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=EXTRACTION_WORKERS * 2, max_keepalive_connections=EXTRACTION_WORKERS),
+            timeout=LLM_TIMEOUT
         )
-        return prompt | llm | output_parser
+        
+        # Prebuilt chain pool: {(model, chain_name): prompt | llm | parser}
+        self._chain_specs = {
+            "extract": (self.extract_prompt, self._parser),
+            "insight": (self.insight_prompt, self._str_parser)
+        }
+        self._chains = {}
+        for model in self.models:
+            llm = ChatGroq(
+                temperature=0,
+                model_name=model,
+                groq_api_key=self.key,
+                http_client=self._http_client
+            )
+            for chain_name, (prompt, output_parser) in self._chain_specs.items():
+                self._chains[(model, chain_name)] = prompt | llm | output_parser
+        
+        # Per-model latency stats: {model: {calls, errors, rate_limited, tokens, total_ms, max_ms}}
+        self._stats = {m: {"calls": 0, "errors": 0, "rate_limited": 0, "tokens": 0, "total_ms": 0.0, "max_ms": 0.0} for m in self.models}
+        self._stats_lock = threading.Lock()
+        
+    def _get_chain(self, model_name: str, chain_name: str):
+        """Returns the prebuilt chain for (model, chain_name)."""
+        return self._chains[(model_name, chain_name)]
+
+    def _record(self, model: str, elapsed_ms: float, tokens: int = 0, error: bool = False, rate_limited: bool = False):
+        with self._stats_lock:
+            stats = self._stats[model]
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+            stats["errors"] += int(error)
+            stats["rate_limited"] += int(rate_limited)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
 
-    def _invoke_with_fallback(self, prompt, output_parser, input_data: Dict[str, Any]):
-        """Tries to run the chain with fallback models if rate limit is hit."""
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns per-model call counts, estimated tokens per call and latency (avg/max in ms)."""
+        with self._stats_lock:
+            return {
+                model: {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "rate_limited": s["rate_limited"],
+                    "avg_tokens": round(s["tokens"] / s["calls"], 1) if s["calls"] else 0.0,
+                    "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else 0.0,
+                    "max_ms": round(s["max_ms"], 1)
+                }
+                for model, s in self._stats.items()
+            }
+
+    def _invoke_with_fallback(self, chain_name: str, input_data: Dict[str, Any],
+                              est_tokens: int = None, can_use: Callable[[str], bool] = None):
+        """
+        Runs the chain on the best available model, pacing calls through the shared
+        rate-limit scheduler. On a 429 the model is paused for its Retry-After and retried;
+        we only fall back to a weaker model when the wait would be too long.
+        `can_use(model)` lets callers skip models whose token budget the input exceeds.
+        """
         errors = []
+        over_budget = False
+        if est_tokens is None:
+            est_tokens = sum(estimate_tokens(str(v)) for v in input_data.values()) + EST_OUTPUT_TOKENS
         
-        for model in self.models:
-            try:
-                # print(f"[AGENT] Trying model: {model}")
-                chain = self._get_chain(model, prompt, output_parser)
-                return chain.invoke(input_data)
-            except Exception as e:
-                err_str = str(e).lower()
-                # Check for rate limit (429) or overload errors
-                if "429" in err_str or "rate limit" in err_str:
-                    print(f"[WARN] Rate limit hit for {model}. Switching to backup...")
-                    errors.append(f"{model}: Rate Limit")
-                    continue
-                else:
-                    # If it's a different error (e.g. parsing), try next model just in case,
-                    # but it might be prompt related.
-                    print(f"[WARN] Error with {model}: {e}")
-                    errors.append(f"{model}: {e}")
-                    continue
+        for fallbacks, model in enumerate(self.models): # fallbacks = models skipped or failed before this one
+            if can_use is not None and not can_use(model):
+                errors.append(f"{model}: Over token budget")
+                over_budget = True
+                continue
+            
+            # Skip models that are cooling down for longer than we are willing to wait
+            if scheduler.wait_time(model) > MAX_RETRY_WAIT:
+                errors.append(f"{model}: Cooling down")
+                continue
+            
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                with metrics.span("llm_queue", model=model):
+                    scheduler.acquire(model, est_tokens)
+                metrics.inc("llm_tokens_total", est_tokens, model=model)
+                start = time.perf_counter()
+                try:
+                    with metrics.span("llm_call", classify=_llm_outcome, model=model, chain=chain_name,
+                                      tokens=est_tokens, fallbacks=fallbacks, attempt=attempt) as call:
+                        result = self._get_chain(model, chain_name).invoke(input_data)
+                        call.set(outcome="ok")
+                    self._record(model, (time.perf_counter() - start) * 1000, tokens=est_tokens)
+                    metrics.inc("llm_calls_total", model=model, outcome="ok")
+                    if fallbacks:
+                        metrics.inc("llm_fallbacks_total", model=model)
+                    return result
+                except Exception as e:
+                    rate_limited = is_rate_limit_error(e)
+                    self._record(model, (time.perf_counter() - start) * 1000, tokens=est_tokens,
+                                 error=True, rate_limited=rate_limited)
+                    metrics.inc("llm_calls_total", model=model, outcome=_llm_outcome(e))
+                    if rate_limited:
+                        retry_after = get_retry_after(e) or DEFAULT_RETRY_AFTER
+                        scheduler.penalize(model, retry_after)
+                        if retry_after <= MAX_RETRY_WAIT and attempt < MAX_RATE_LIMIT_RETRIES:
+                            print(f"[WARN] Rate limit hit for {model}. Retrying in {retry_after:.1f}s...")
+                            continue
+                        print(f"[WARN] Rate limit hit for {model}. Switching to backup...")
+                        errors.append(f"{model}: Rate Limit")
+                    else:
+                        # If it's a different error (e.g. parsing), try next model just in case,
+                        # but it might be prompt related.
+                        print(f"[WARN] Error with {model}: {e}")
+                        errors.append(f"{model}: {e}")
+                    break
                     
-        raise Exception(f"All models failed: {errors}")
+        raise AllModelsFailed(f"All models failed: {errors}", over_budget=over_budget)
 
-    def extract_topics(self, reviews_text: str) -> List[str]:
+    def extract_review_topics(self, batch: List[Dict]) -> Optional[List[Optional[List[str]]]]:
+        """
+        Extracts topics for a packed chunk of reviews; returns one entry per review: its
+        topic list, or None if the answer did not mention that review.
+        If every model that fits the chunk's token budget fails (e.g. the primary is rate
+        limited and the fallbacks have smaller budgets), the chunk is split and retried.
+        Returns None if extraction failed for the chunk (or any part of it).
+        """
         try:
-            return self._invoke_with_fallback(
-                self.extract_prompt, 
-                self.parser,  # Wait, parser wasn't re-initialized. It's stateless so it's fine.
-                {"reviews_text": reviews_text}
+            output = self._invoke_with_fallback(
+                "extract",
+                {"reviews_text": _format_chunk(batch)},
+                est_tokens=chunk_tokens(batch),
+                can_use=lambda model: fits(batch, model)
             )
-        except Exception as e:
+            return _topics_per_review(output, len(batch))
+        except AllModelsFailed as e:
+            if e.over_budget and len(batch) > 1:
+                mid = len(batch) // 2
+                print(f"[AGENT] Chunk of {len(batch)} reviews too large for available models; splitting...")
+                first = self.extract_review_topics(batch[:mid])
+                second = self.extract_review_topics(batch[mid:]) if first is not None else None
+                return first + second if second is not None else None
             print(f"[ERROR] Extraction failed after retries: {e}")
-            return []
-            
+            return None
+
     def generate_insights(self, trend_dict, new_topics, spikes) -> str:
         try:
             trend_view = ""
@@ -186,8 +732,7 @@ class Agent:
                 trend_view += f"{topic}: {counts}\n"
                 
             return self._invoke_with_fallback(
-                self.insight_prompt,
-                self.str_parser,
+                "insight",
                 {
                     "trend_str": trend_view,
                     "new_topics": ", ".join(new_topics),
@@ -200,73 +745,225 @@ class Agent:
 
     @property
     def parser(self):
-        return JsonOutputParser()
+        return self._parser
         
     @property
     def str_parser(self):
-        return StrOutputParser()
+        return self._str_parser
+
+# --- Singleton Instances (lazy) ---
+# Built on first use (or by warm_up() in the background) so importing this module,
+# and therefore starting the API, does not load the embedding model or langchain.
+_taxonomy_mgr = None
+_agent = None
+_init_lock = threading.Lock()
+_init_error = None
+
+# One extraction pool for the whole process (threads start on first use): concurrent
+# analyses (batches, jobs, parallel requests) share EXTRACTION_WORKERS in-flight LLM calls
+# instead of each opening its own pool, and the scheduler paces them all per model.
+_extraction_pool = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS, thread_name_prefix="extract")
+
+def get_taxonomy_mgr() -> TaxonomyManager:
+    global _taxonomy_mgr
+    if _taxonomy_mgr is None:
+        with _init_lock:
+            if _taxonomy_mgr is None:
+                _taxonomy_mgr = TaxonomyManager()
+    return _taxonomy_mgr
+
+def get_agent() -> Agent:
+    global _agent
+    if _agent is None:
+        with _init_lock:
+            if _agent is None:
+                _agent = Agent()
+    return _agent
 
-# --- Singleton Instances ---
-# These will be imported by main.py
-taxonomy_mgr = TaxonomyManager()
-agent = Agent()
+def warm_up():
+    """Builds both singletons. Meant to run in a background thread at startup."""
+    global _init_error
+    try:
+        start = time.perf_counter()
+        get_taxonomy_mgr()
+        get_agent()
+        print(f"[STARTUP] Models ready in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        _init_error = str(e)
+        print(f"[ERROR] Warm-up failed: {e}")
+
+def is_ready() -> bool:
+    return _taxonomy_mgr is not None and _agent is not None
+
+def init_error() -> str:
+    return _init_error
 
 # --- 3. PIPELINE ORCHESTRATOR ---
-def process_daily_batch(date_str: str, reviews: List[Dict]) -> Dict[str, int]:
+def _format_chunk(batch: List[Dict]) -> str:
     """
-    Processes a batch of reviews for a given date, extracts topics,
-    maps them to the taxonomy, and returns daily topic counts.
+    Formats a chunk of (deduplicated) reviews for the extraction prompt.
+    Reviews get short positional IDs ("1", "2", ...) instead of UUIDs to save tokens.
     """
-    print(f"[PROCESSING] {len(reviews)} reviews for {date_str}")
-    
-    daily_topics = {} # {topic: count}
-    
-    # Process in chunks of 20 to avoid context limits
-    CHUNK_SIZE = 20
-    for i in range(0, len(reviews), CHUNK_SIZE):
-        batch = reviews[i:i+CHUNK_SIZE]
-        
-        # Format reviews for prompt
-        reviews_text = ""
-        for r in batch:
-            # Filter extremely short reviews to save tokens and noise
-            if len(r['content']) < 4: 
-                continue
-            reviews_text += f"ID: {r['reviewId']}\nText: {r['content']}\n---\n"
-            
-        if not reviews_text:
-            continue
+    reviews_text = ""
+    for i, r in enumerate(batch, start=1):
+        reviews_text += f"ID: {i}\nText: {r['content']}\n---\n"
+    return reviews_text
 
-        # 1. Extract
-        extracted_topics = agent.extract_topics(reviews_text)
+def _topics_per_review(output: Any, batch_size: int) -> List[Optional[List[str]]]:
+    """
+    Aligns extraction output with the chunk's reviews. A bare JSON list (model ignored
+    the format) cannot be attributed, so it is counted once, on the first review.
+    Reviews the output does not mention get None (unknown, not "no topic").
+    """
+    per_review = [None] * batch_size
+    if isinstance(output, dict):
+        for key, topics in output.items():
+            idx = int(key) - 1 if str(key).isdigit() else -1
+            if 0 <= idx < batch_size and isinstance(topics, list):
+                per_review[idx] = [t for t in topics if t and isinstance(t, str)]
+    elif isinstance(output, list) and batch_size:
+        per_review[0] = [t for t in output if t and isinstance(t, str)]
+    return per_review
+
+def process_batches(reviews_by_date: Dict[str, List[Dict]],
+                    on_date_done: Callable[[str, Dict[str, int]], None] = None,
+                    stats: Dict[str, Dict[str, int]] = None,
+                    failed: Set[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Processes reviews for several dates at once. Exact/near-duplicate reviews are
+    collapsed first (prefilter), so the LLM sees one representative per group and its
+    topics are counted `weight` times. Representatives that confidently match a known
+    topic or labelled exemplar by embedding are counted directly (fast path); only the
+    rest go to the LLM. Extraction for every chunk of every date runs
+    concurrently on the shared extraction pool (paced by the rate-limit scheduler); mapping to the
+    taxonomy stays sequential and in chunk order so results are stable.
+    `on_date_done(date, counts)` is called as soon as each date's last chunk is mapped.
+    If `stats` is given it is filled with per-date prefilter/token stats.
+    If `failed` is given, dates with a chunk whose extraction failed are added to it
+    (before their on_date_done), since their counts are incomplete.
+    Returns {date: {topic: count}}.
+    """
+    taxonomy_mgr = get_taxonomy_mgr()
+    agent_models = get_agent().models if reviews_by_date else []
+    results = {date_str: {} for date_str in reviews_by_date}
+
+    # Build (date, chunk_no, n_chunks, representatives) jobs across all dates
+    jobs = []
+    for date_str, reviews in reviews_by_date.items():
+        representatives, day_stats = prefilter.dedupe_reviews(reviews)
+        print(f"[PROCESSING] {len(reviews)} reviews for {date_str} -> {len(representatives)} unique "
+              f"(~{day_stats['tokens_saved']} tokens saved by dedup, ~{day_stats['tokens_saved_ids']} by short IDs)")
         
-        # 2. Map & Count
-        for raw_topic in extracted_topics:
-            if not raw_topic: continue
-            
-            # Map valid topics
-            mapped_topic = taxonomy_mgr.map_extracted_topic(raw_topic)
-            
-            # Update taxonomy if new
-            if mapped_topic not in taxonomy_mgr.topics:
-                print(f"[NEW TOPIC] {mapped_topic}")
-                taxonomy_mgr.add_new_topic(mapped_topic)
+        # Fast path: reviews that confidently match a known topic/exemplar skip the LLM
+        to_llm = representatives
+        day_stats["fast_path"] = 0
+        if FAST_PATH_ENABLED and representatives:
+            vectors, labels = taxonomy_mgr.classify_reviews([r['content'] for r in representatives])
+            to_llm = []
+            for review, vector, (confident, topic) in zip(representatives, vectors, labels):
+                if confident:
+                    day_stats["fast_path"] += 1
+                    if topic is not None:
+                        results[date_str][topic] = results[date_str].get(topic, 0) + review['weight']
+                else:
+                    review['embedding'] = vector
+                    to_llm.append(review)
+        
+        # Pack to the primary model's token budget (fallbacks split chunks that do not fit)
+        chunks = pack_reviews(to_llm, agent_models[0])
+        n_chunks = len(chunks)
+        day_stats["llm_reviews"] = len(to_llm)
+        day_stats["llm_calls"] = n_chunks
+        day_stats["llm_review_rate"] = round(len(to_llm) / len(representatives), 3) if representatives else 0.0
+        day_stats["avg_reviews_per_call"] = round(len(to_llm) / n_chunks, 1) if n_chunks else 0.0
+        day_stats["avg_tokens_per_call"] = round(sum(chunk_tokens(c) for c in chunks) / n_chunks) if n_chunks else 0
+        print(f"   {day_stats['fast_path']} matched by embedding, {len(to_llm)} to the LLM in {n_chunks} call(s) "
+              f"(~{day_stats['avg_tokens_per_call']} tokens/call)")
+        if stats is not None:
+            stats[date_str] = day_stats
+        for chunk_no, chunk in enumerate(chunks, start=1):
+            jobs.append((date_str, chunk_no, n_chunks, chunk))
+
+    last_job = {date_str: idx for idx, (date_str, _, _, _) in enumerate(jobs)}
+    
+    # Dates with nothing left to extract are done already
+    for date_str in reviews_by_date:
+        if date_str not in last_job and on_date_done:
+            on_date_done(date_str, results[date_str])
+    if not jobs:
+        return results
+
+    agent = get_agent()
+
+    # 1. Extract (in parallel, on the shared pool)
+    futures = [_extraction_pool.submit(metrics.propagate(agent.extract_review_topics), batch) for _, _, _, batch in jobs]
+    try:
+        # 2. Map & Count (in submission order)
+        for idx, ((date_str, chunk_no, n_chunks, batch), future) in enumerate(zip(jobs, futures)):
+            daily_topics = results[date_str]
+            per_review = future.result()
             
-            # Count
-            daily_topics[mapped_topic] = daily_topics.get(mapped_topic, 0) + 1
+            if per_review is None:
+                # Nothing is known about these reviews: neither counted nor kept as exemplars
+                print(f"   [WARN] Extraction failed for {date_str} batch {chunk_no}/{n_chunks}; not counted")
+                if failed is not None:
+                    failed.add(date_str)
+            else:
+                # Map the whole chunk in one embedding call (new topics are added to the taxonomy)
+                flat = [t for topics in per_review if topics for t in topics]
+                mapped = iter(taxonomy_mgr.map_extracted_topics(flat))
+                ex_topics, ex_vectors = [], []
+                for review, topics in zip(batch, per_review):
+                    if topics is None:
+                        continue
+                    # A review counts once per topic, times the size of its duplicate group
+                    review_topics = {next(mapped) for _ in topics}
+                    for mapped_topic in review_topics:
+                        daily_topics[mapped_topic] = daily_topics.get(mapped_topic, 0) + review['weight']
+                    
+                    # Unambiguous labels become exemplars for the fast path ([] = the LLM saw no topic)
+                    if len(review_topics) <= 1 and 'embedding' in review:
+                        ex_topics.append(next(iter(review_topics), None))
+                        ex_vectors.append(review['embedding'])
+                taxonomy_mgr.record_examples(ex_topics, ex_vectors)
+                print(f"   Processed {date_str} batch {chunk_no}/{n_chunks}")
             
-        print(f"   Processed batch {i//CHUNK_SIZE + 1}/{(len(reviews)//CHUNK_SIZE)+1}")
+            if idx == last_job[date_str] and on_date_done:
+                on_date_done(date_str, daily_topics)
+    finally:
+        # On failure, chunks still queued must not keep spending the shared LLM budget
+        for future in futures:
+            future.cancel()
 
     # Persist taxonomy updates
     taxonomy_mgr.save_taxonomy()
-    print(f"[DONE] Processed reviews for {date_str}")
-    return daily_topics
+    print(f"[DONE] Processed reviews for {len(reviews_by_date)} date(s)")
+    return results
+
+def process_daily_batch(date_str: str, reviews: List[Dict]) -> Dict[str, int]:
+    """
+    Processes a batch of reviews for a given date, extracts topics,
+    maps them to the taxonomy, and returns daily topic counts.
+    """
+    return process_batches({date_str: reviews})[date_str]
+
+def invalidate_taxonomy_cache() -> str:
+    """
+    Marks the taxonomy as edited: bumps its revision and purges daily topic counts
+    cached under older versions, for every app (the revision is global, so no older
+    entry can be read again). Returns the new taxonomy version.
+    """
+    taxonomy_mgr = get_taxonomy_mgr()
+    taxonomy_mgr.bump_revision()
+    removed = topic_cache.invalidate(keep_version=taxonomy_mgr.version)
+    print(f"[CACHE] Dropped {removed} cached daily result(s).")
+    return taxonomy_mgr.version
 
 def generate_insights_for_period(trend_data: Dict[str, Any], new_topics: List[str], spikes: List[str]) -> str:
     """
     Generates a summary of insights based on trend data, new topics, and spiking topics.
     """
     print("[INSIGHTS] Generating insights...")
-    insights = agent.generate_insights(trend_data, new_topics, spikes)
+    insights = get_agent().generate_insights(trend_data, new_topics, spikes)
     print("[INSIGHTS] Insights generated.")
     return insights
@@ -1,76 +1,138 @@
+import bisect
+import numpy as np
 from typing import List, Dict, Any
-import pandas as pd
+
+MIN_COUNT = 2 # Ignore topics with fewer mentions on the last day (noise)
+SPIKE_RATIO = 2 # Spec: count_today > 2 * count_previous
+SPIKE_FROM_ZERO = 5 # 0 -> N counts as a spike from N = 5
+ROLLING_WINDOW = 7 # Days in the rolling baseline
+MIN_BASELINE_DAYS = 3 # Fewer previous days than this: no rolling spikes
+Z_THRESHOLD = 3.0 # Rolling spike: last day >= mean + 3 std of the window
+MIN_STD = 1.0 # Floor for the baseline std, so flat near-zero series do not explode
+
+# --- TREND MATRIX ---
+class TrendMatrix:
+    """
+    Topic x date count matrix (int64) with a topic index, built for 90-day x 10k-topic ranges.
+
+    Rows are topics in first-seen order, columns are dates in ascending order. Capacity
+    doubles along both axes, so appending the next day (or new topics) does not rebuild
+    the matrix; only a day inserted before the last one shifts columns.
+    """
+    def __init__(self):
+        self.topics = [] # Row -> topic
+        self.index = {} # Topic -> row
+        self.dates = [] # Column -> date, ascending
+        # Stored day-major (days x topics) so writing one day is a contiguous row
+        self._by_day = np.zeros((8, 64), dtype=np.int64)
+
+    @classmethod
+    def from_daily(cls, daily_stats_map: Dict[str, Dict[str, int]]) -> "TrendMatrix":
+        trends = cls()
+        for date in sorted(daily_stats_map.keys()):
+            trends.add_day(date, daily_stats_map[date])
+        return trends
+
+    @property
+    def counts(self) -> np.ndarray:
+        """(n_topics, n_days) view of the counts."""
+        return self._by_day[:len(self.dates), :len(self.topics)].T
+
+    def _grow(self, days: int, topics: int):
+        cap_days, cap_topics = self._by_day.shape
+        if days <= cap_days and topics <= cap_topics:
+            return
+        new_days = max(days, cap_days * 2) if days > cap_days else cap_days
+        new_topics = max(topics, cap_topics * 2) if topics > cap_topics else cap_topics
+        grown = np.zeros((new_days, new_topics), dtype=np.int64)
+        grown[:cap_days, :cap_topics] = self._by_day
+        self._by_day = grown
+
+    def add_day(self, date: str, stats: Dict[str, int]):
+        """
+        Adds (or replaces) one day's {topic: count}. The next date is appended in place;
+        an earlier date is inserted at its sorted position.
+        """
+        try:
+            rows = np.fromiter(map(self.index.__getitem__, stats), dtype=np.int64, count=len(stats))
+        except KeyError: # First sighting of some topics
+            for topic in stats:
+                if topic not in self.index:
+                    self.index[topic] = len(self.topics)
+                    self.topics.append(topic)
+            rows = np.fromiter(map(self.index.__getitem__, stats), dtype=np.int64, count=len(stats))
+
+        day = bisect.bisect_left(self.dates, date)
+        exists = day < len(self.dates) and self.dates[day] == date
+        self._grow(len(self.dates) + (0 if exists else 1), len(self.topics))
+        if not exists:
+            if day < len(self.dates):
+                # Shift later days by one
+                self._by_day[day + 1:len(self.dates) + 1] = self._by_day[day:len(self.dates)].copy()
+            self.dates.insert(day, date)
+        self._by_day[day] = 0
+        self._by_day[day, rows] = np.fromiter(stats.values(), dtype=np.int64, count=len(stats))
+
+    # --- Vectorized statistics ---
+    def totals(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    def order(self) -> np.ndarray:
+        """Rows sorted by total volume, descending (ties keep first-seen order)."""
+        return np.argsort(-self.totals(), kind="stable")
+
+    def new_topic_mask(self) -> np.ndarray:
+        """Present on the last day (>= MIN_COUNT) and zero on every earlier day."""
+        counts = self.counts
+        if counts.shape[1] < 2:
+            return np.zeros(counts.shape[0], dtype=bool)
+        return (counts[:, -1] >= MIN_COUNT) & (counts[:, :-1].sum(axis=1) == 0)
+
+    def spike_mask(self) -> np.ndarray:
+        """Last day vs the previous day: > SPIKE_RATIO x, or 0 -> SPIKE_FROM_ZERO or more."""
+        counts = self.counts
+        if counts.shape[1] < 2:
+            return np.zeros(counts.shape[0], dtype=bool)
+        last, prev = counts[:, -1], counts[:, -2]
+        return (last >= MIN_COUNT) & (
+            ((prev > 0) & (last > SPIKE_RATIO * prev)) | ((prev == 0) & (last >= SPIKE_FROM_ZERO))
+        )
+
+    def rolling_spike_mask(self, window: int = ROLLING_WINDOW, threshold: float = Z_THRESHOLD) -> np.ndarray:
+        """Last day is >= `threshold` rolling standard deviations above its baseline."""
+        counts = self.counts
+        if counts.shape[1] <= MIN_BASELINE_DAYS:
+            return np.zeros(counts.shape[0], dtype=bool)
+        # Only the last column is needed: baseline over the `window` days before it
+        history = counts[:, -1 - window:-1].astype(np.float64)
+        std = np.maximum(history.std(axis=1), MIN_STD)
+        z = (counts[:, -1] - history.mean(axis=1)) / std
+        return (counts[:, -1] >= SPIKE_FROM_ZERO) & (z >= threshold)
+
+    def analyze(self) -> Dict[str, Any]:
+        """Same result as analyze_trends(), plus `rolling_spikes`."""
+        order = self.order()
+        sorted_topics = [self.topics[i] for i in order]
+        new_mask = self.new_topic_mask()
+        spike_mask = self.spike_mask() & ~new_mask # New topics are not double-badged as spikes
+        rolling_mask = self.rolling_spike_mask() & ~new_mask
+        return {
+            "trend_matrix": dict(zip(sorted_topics, self.counts[order].tolist())),
+            "new_topics": [self.topics[i] for i in order if new_mask[i]],
+            "spikes": [self.topics[i] for i in order if spike_mask[i]],
+            "rolling_spikes": [self.topics[i] for i in order if rolling_mask[i]],
+            "dates": list(self.dates)
+        }
 
 def analyze_trends(daily_stats_map: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
     """
     Analyzes daily stats to produce the trend matrix, new topics list, and spike list.
-    
+
     daily_stats_map: { "2025-01-01": {"topic1": 10}, "2025-01-02": {"topic1": 20, "topic2": 5} }
+
+    New: present (>= 2) on the LAST date, 0 on all previous dates.
+    Spike: last date > 2 x previous date (or 0 -> 5+), new topics excluded.
+    Rolling spike: last date >= 3 std above the mean of the previous 7 days.
+    Topics are ordered by total volume, descending, in every list.
     """
-    
-    # 1. Build DataFrame
-    # Rows: Topics, Cols: Dates
-    # Accumulate all unique topics
-    all_topics = set()
-    for date, stats in daily_stats_map.items():
-        all_topics.update(stats.keys())
-        
-    dates = sorted(daily_stats_map.keys())
-    
-    # Structure: {topic: [count_d1, count_d2, ...]}
-    trend_matrix = {topic: [] for topic in all_topics}
-    
-    for date in dates:
-        stats = daily_stats_map.get(date, {})
-        for topic in all_topics:
-            trend_matrix[topic].append(stats.get(topic, 0))
-            
-    # 2. Detect New Topics & Spikes
-    # Logic:
-    # New: Present in the LAST date, but 0 in all previous dates.
-    # Spike: Count in LAST date > 2 * (Avg of previous dates or just prev date). Using prev date for simplicity as per spec.
-    
-    new_topics = []
-    spikes = []
-    
-    if len(dates) >= 1:
-        latest_date_idx = len(dates) - 1
-        
-        for topic, counts in trend_matrix.items():
-            current_count = counts[latest_date_idx]
-            
-            # Simple check: ignore very small counts to reduce noise
-            if current_count < 2:
-                continue
-            
-            # New Topic Check
-            if len(dates) > 1:
-                prev_counts = counts[:latest_date_idx]
-                if sum(prev_counts) == 0:
-                    new_topics.append(topic)
-            
-            # Spike Check
-            if len(dates) > 1:
-                prev_count = counts[latest_date_idx - 1]
-                # Avoid division by zero, treat 0->N (large N) as new, but if prev was small...
-                # Spec: count_today > 2 * count_previous
-                if prev_count > 0:
-                    if current_count > 2 * prev_count:
-                        spikes.append(topic)
-                elif prev_count == 0 and current_count >= 5: # If 0 -> 5, considered spike/new
-                     spikes.append(topic)
-
-    # Sort trend matrix by total volume descending
-    sorted_topics = sorted(trend_matrix.keys(), key=lambda t: sum(trend_matrix[t]), reverse=True)
-    sorted_trend_matrix = {t: trend_matrix[t] for t in sorted_topics}
-
-    return {
-        "trend_matrix": sorted_trend_matrix,
-        "new_topics": new_topics,
-        "spikes": peaks_check(spikes, new_topics), # Helper cleanup
-        "dates": dates
-    }
-
-def peaks_check(spikes, new_topics):
-    # Remove topics from spikes if they are already in new_topics to avoid double badging
-    return [s for s in spikes if s not in new_topics]
+    return TrendMatrix.from_daily(daily_stats_map).analyze()
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+from typing import Tuple
+
+# Optional dependency: pip install hnswlib
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSW_AVAILABLE = False
+
+# --- HNSW TOPIC INDEX ---
+class HnswTopicIndex:
+    """
+    Approximate nearest-neighbour index over normalized topic embeddings (cosine space).
+    Labels are the row numbers of TaxonomyManager's topic matrix, so candidates can be
+    re-scored exactly against that matrix.
+    """
+    def __init__(self, dim: int, max_elements: int = 1024, ef_construction: int = 200, M: int = 16, ef: int = 64):
+        if not HNSW_AVAILABLE:
+            raise ImportError("hnswlib is not installed (pip install hnswlib)")
+        self.dim = dim
+        self.ef = ef
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+        self.index.init_index(max_elements=max_elements, ef_construction=ef_construction, M=M)
+        self.index.set_ef(ef)
+
+    def __len__(self):
+        return self.index.get_current_count()
+
+    def add(self, vectors: np.ndarray, start_label: int):
+        """Inserts rows with labels start_label, start_label + 1, ... (grows capacity as needed)."""
+        vectors = np.atleast_2d(vectors)
+        needed = len(self) + len(vectors)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, self.index.get_max_elements() * 2))
+        labels = np.arange(start_label, start_label + len(vectors))
+        self.index.add_items(vectors, labels)
+
+    def query(self, vectors: np.ndarray, k: int = 10) -> np.ndarray:
+        """Returns (n, k) candidate row labels for each query vector."""
+        k = min(k, len(self))
+        # hnswlib needs ef >= k for a full result set
+        self.index.set_ef(max(self.ef, k))
+        labels, _ = self.index.knn_query(np.atleast_2d(vectors), k=k)
+        return labels
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp" # Workers may save concurrently
+        self.index.save_index(tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, dim: int, ef: int = 64) -> "HnswTopicIndex":
+        obj = cls.__new__(cls)
+        obj.dim = dim
+        obj.ef = ef
+        obj.index = hnswlib.Index(space="cosine", dim=dim)
+        obj.index.load_index(path)
+        obj.index.set_ef(ef)
+        return obj
+
+def best_matches(matrix: np.ndarray, vectors: np.ndarray, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Re-scores ANN candidates exactly. Returns (best_row, best_score) per query, so the
+    SIMILARITY_THRESHOLD decision uses true cosine scores, not approximate distances.
+    """
+    scores = np.einsum("nkd,nd->nk", matrix[candidates], vectors)
+    pick = scores.argmax(axis=1)
+    rows = np.arange(len(vectors))
+    return candidates[rows, pick], scores[rows, pick]
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, List
+
+# Optional dependency: pip install tiktoken (more accurate counts; the heuristic is close enough)
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# Token budget per extraction call (prompt + expected output), per model.
+# Smaller models / fallbacks get smaller budgets so a packed chunk stays fast and well-formed.
+MODEL_TOKEN_BUDGETS = {
+    "llama-3.3-70b-versatile": 3000,
+    "llama-3.1-8b-instant": 2000,
+    "mixtral-8x7b-32768": 2000,
+    "gemma2-9b-it": 1500,
+}
+DEFAULT_TOKEN_BUDGET = 1500
+MAX_REVIEWS_PER_CALL = 60 # Keeps the JSON answer short enough to parse reliably
+PROMPT_OVERHEAD_TOKENS = 90 # Instructions in Agent.extract_prompt
+OUTPUT_TOKENS_PER_REVIEW = 12 # '"12": ["Topic", ...]' in the answer
+REVIEW_OVERHEAD_TOKENS = 8 # "ID: n\nText: ...\n---\n"
+CHARS_PER_TOKEN = 4 # Character cut for reviews that cannot be truncated at word boundaries
+
+_WORD = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate: tiktoken if installed, else words/punctuation with a long-word surcharge."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    pieces = _WORD.findall(text)
+    # Romanized Hindi and rare words split into several BPE pieces
+    return sum(1 + len(p) // 6 for p in pieces)
+
+def review_tokens(review: Dict) -> int:
+    """Tokens one review adds to an extraction call (prompt side + its share of the answer)."""
+    return estimate_tokens(review['content']) + REVIEW_OVERHEAD_TOKENS + OUTPUT_TOKENS_PER_REVIEW
+
+def token_budget(model: str) -> int:
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+def fits(reviews: List[Dict], model: str) -> bool:
+    return PROMPT_OVERHEAD_TOKENS + sum(review_tokens(r) for r in reviews) <= token_budget(model)
+
+def truncate_review(review: Dict, budget: int) -> Dict:
+    """Shortens a single review that would not fit on its own into a call of `budget` tokens."""
+    limit = budget - PROMPT_OVERHEAD_TOKENS - REVIEW_OVERHEAD_TOKENS - OUTPUT_TOKENS_PER_REVIEW
+    if estimate_tokens(review['content']) <= limit:
+        return review
+    words = review['content'].split()
+    while words and estimate_tokens(" ".join(words)) > limit:
+        words = words[:int(len(words) * 0.8)]
+    content = " ".join(words)
+    if not content:
+        # A few oversized "words" (pasted URLs, unspaced scripts): cut characters instead
+        content = review['content'][:limit * CHARS_PER_TOKEN]
+        while content and estimate_tokens(content) > limit:
+            content = content[:int(len(content) * 0.8)]
+    return {**review, 'content': content}
+
+def pack_reviews(reviews: List[Dict], model: str) -> List[List[Dict]]:
+    """
+    Greedily packs reviews, in order, into chunks that fit `model`'s token budget
+    (and MAX_REVIEWS_PER_CALL). One-word reviews share a call; long rants get fewer neighbours.
+    """
+    budget = token_budget(model)
+    chunks, current, used = [], [], PROMPT_OVERHEAD_TOKENS
+    for review in reviews:
+        review = truncate_review(review, budget)
+        cost = review_tokens(review)
+        if current and (used + cost > budget or len(current) >= MAX_REVIEWS_PER_CALL):
+            chunks.append(current)
+            current, used = [], PROMPT_OVERHEAD_TOKENS
+        current.append(review)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def chunk_tokens(reviews: List[Dict]) -> int:
+    return PROMPT_OVERHEAD_TOKENS + sum(review_tokens(r) for r in reviews)
@@ -0,0 +1,118 @@
+"""
+Recall/latency benchmark: HNSW topic index vs. the exact matrix search in TaxonomyManager.
+
+Run from backend/:
+    python -m benchmarks.ann_recall --topics 5000 20000 100000 --ef 64 128 256 --candidates 10 32
+
+Topics are synthetic clustered unit vectors (near-duplicate phrasings of the same
+complaint sit close together), queries are noisy copies of topics plus unrelated
+vectors, so both sides of SIMILARITY_THRESHOLD are exercised. Queries are timed in
+batches of --batch, about one extraction chunk's topics (a batch of thousands would
+flatter the exact matmul). The index is built once per topic count and queried with
+every ef/candidates pair. Use it to choose ANN_EF,
+ANN_CANDIDATES (highest agreement at acceptable latency) and ANN_MIN_TOPICS (the
+smallest taxonomy where that setting is faster than exact search).
+Exits non-zero when any setting's threshold agreement falls below --min-agreement.
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+from agent import ANN_CANDIDATES, ANN_EF, SIMILARITY_THRESHOLD
+from ann_index import HNSW_AVAILABLE, HnswTopicIndex, best_matches
+
+DIM = 384 # all-MiniLM-L6-v2
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+def make_data(n_topics: int, n_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = _unit(rng.standard_normal((max(1, n_topics // 20), DIM)))
+    topics = _unit(centers[rng.integers(0, len(centers), n_topics)] + 0.35 * rng.standard_normal((n_topics, DIM)) / np.sqrt(DIM) * 8)
+
+    # Half the queries are paraphrases of existing topics, half are unrelated
+    n_near = n_queries // 2
+    near = topics[rng.integers(0, n_topics, n_near)] + rng.uniform(0.2, 0.9, (n_near, 1)) * rng.standard_normal((n_near, DIM)) / np.sqrt(DIM)
+    far = rng.standard_normal((n_queries - n_near, DIM))
+    return topics, _unit(np.vstack([near, far]))
+
+def _batches(n: int, size: int):
+    return [slice(i, i + size) for i in range(0, n, size)]
+
+def run(n_topics: int, n_queries: int, batch: int, candidates_list, ef_list) -> list:
+    topics, queries = make_data(n_topics, n_queries)
+    exact_idx = np.zeros(n_queries, dtype=int)
+    exact_score = np.zeros(n_queries, dtype=np.float32)
+    ann_idx = np.zeros(n_queries, dtype=int)
+    ann_score = np.zeros(n_queries, dtype=np.float32)
+
+    # Exact (current behaviour)
+    start = time.perf_counter()
+    for s in _batches(n_queries, batch):
+        scores = queries[s] @ topics.T
+        exact_idx[s] = scores.argmax(axis=1)
+        exact_score[s] = scores[np.arange(len(scores)), exact_idx[s]]
+    exact_ms = (time.perf_counter() - start) * 1000
+    exact_match = exact_score >= SIMILARITY_THRESHOLD
+
+    start = time.perf_counter()
+    index = HnswTopicIndex(DIM, max_elements=n_topics)
+    index.add(topics, start_label=0)
+    build_s = time.perf_counter() - start
+
+    results = []
+    for ef in ef_list:
+        for candidates in candidates_list:
+            # HNSW shortlist + exact re-score
+            index.ef = ef
+            start = time.perf_counter()
+            for s in _batches(n_queries, batch):
+                cand = index.query(queries[s], k=candidates)
+                ann_idx[s], ann_score[s] = best_matches(topics, queries[s], cand)
+            ann_ms = (time.perf_counter() - start) * 1000
+
+            ann_match = ann_score >= SIMILARITY_THRESHOLD
+            # Same decision: both "new topic", or both map to the same existing topic
+            agree = (~exact_match & ~ann_match) | (exact_match & ann_match & (exact_idx == ann_idx))
+            results.append({
+                "topics": n_topics,
+                "queries": n_queries,
+                "batch": batch,
+                "candidates": candidates,
+                "ef": ef,
+                "recall_at_1": float((exact_idx == ann_idx).mean()),
+                "threshold_agreement": float(agree.mean()),
+                "exact_match_rate": float(exact_match.mean()),
+                "ann_match_rate": float(ann_match.mean()),
+                "exact_ms_per_query": exact_ms / n_queries,
+                "ann_ms_per_query": ann_ms / n_queries,
+                "ann_faster": ann_ms < exact_ms,
+                "ann_build_s": build_s,
+            })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, nargs="+", default=[5000, 20000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=64, help="Queries per lookup")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[ANN_CANDIDATES])
+    parser.add_argument("--ef", type=int, nargs="+", default=[ANN_EF])
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    parser.add_argument("--out", default=None, help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    if not HNSW_AVAILABLE:
+        raise SystemExit("hnswlib is not installed (pip install hnswlib)")
+
+    results = [r for n in args.topics for r in run(n, args.queries, args.batch, args.candidates, args.ef)]
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    worst = min(r["threshold_agreement"] for r in results)
+    if worst < args.min_agreement:
+        raise SystemExit(f"Threshold agreement {worst:.4f} below {args.min_agreement}: raise --ef/--candidates")
@@ -0,0 +1,112 @@
+"""
+Accuracy/speed check for an embedding backend (embeddings.py) against the reference (hf).
+
+Run from backend/:
+    python -m benchmarks.embedding_accuracy --backend int8
+    EMBEDDING_ONNX_FILE=onnx/model_qint8_avx512.onnx python -m benchmarks.embedding_accuracy --backend onnx
+
+Stored topic embeddings keep coming from the reference model after a switch, so the check
+mirrors that: topics are embedded with the reference, queries with both backends, and the
+two mapping decisions are compared per query:
+    topics   each taxonomy topic name (itself excluded) at SIMILARITY_THRESHOLD
+    reviews  fixture reviews at FAST_PATH_THRESHOLD (the fast path's decision)
+A decision is "new/unmatched" or "topic i"; agreement is the share of identical decisions.
+Exits non-zero when agreement falls below --min-agreement.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from agent import FAST_PATH_THRESHOLD, SIMILARITY_THRESHOLD
+from embeddings import BACKENDS, Embedder
+from taxonomy_store import TAXONOMY_DB_FILE, TaxonomyStore
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "2025-12-24.json")
+# Used when there is no taxonomy.db to check against
+SAMPLE_TOPICS = [
+    "Delivery delay", "Late delivery", "Cold food", "Food quality", "Missing items", "Wrong order",
+    "Refund issue", "No refund", "Customer support unresponsive", "Rude delivery partner",
+    "App crashes", "Login issue", "Payment failure", "High delivery charges", "Hidden charges",
+    "Order cancelled", "Coupon not applied", "Poor packaging", "Stale food", "Tracking not working",
+    "Too many ads", "Subscription issue", "Location not detected", "Slow app", "Notification spam",
+]
+
+def decisions(scores: np.ndarray, threshold: float) -> np.ndarray:
+    """Best column per row, or -1 when the best score is below `threshold`."""
+    if scores.shape[1] == 0:
+        return np.full(len(scores), -1)
+    best = scores.argmax(axis=1)
+    return np.where(scores[np.arange(len(scores)), best] >= threshold, best, -1)
+
+def _timed_embed(embedder: Embedder, texts):
+    start = time.perf_counter()
+    vectors = embedder.embed(texts)
+    return vectors, time.perf_counter() - start
+
+def run(backend: str, topics, reviews, processes: int) -> dict:
+    reference = Embedder(kind="hf", processes=0, cache_size=0)
+    candidate = Embedder(kind=backend, processes=processes, cache_size=0)
+
+    ref_topics, ref_topic_s = _timed_embed(reference, topics)
+    cand_topics, cand_topic_s = _timed_embed(candidate, topics)
+    ref_reviews, ref_review_s = _timed_embed(reference, reviews)
+    cand_reviews, cand_review_s = _timed_embed(candidate, reviews)
+
+    # 1. Vector drift
+    cos = np.concatenate([(ref_topics * cand_topics).sum(axis=1), (ref_reviews * cand_reviews).sum(axis=1)])
+
+    # 2. Topic mapping: every topic against the others (self excluded), reference topic matrix
+    ref_scores = ref_topics @ ref_topics.T
+    cand_scores = cand_topics @ ref_topics.T
+    np.fill_diagonal(ref_scores, -1.0)
+    np.fill_diagonal(cand_scores, -1.0)
+    topic_agree = decisions(ref_scores, SIMILARITY_THRESHOLD) == decisions(cand_scores, SIMILARITY_THRESHOLD)
+
+    # 3. Review fast path
+    review_agree = decisions(ref_reviews @ ref_topics.T, FAST_PATH_THRESHOLD) == \
+        decisions(cand_reviews @ ref_topics.T, FAST_PATH_THRESHOLD)
+
+    n_texts = len(topics) + len(reviews)
+    ref_s, cand_s = ref_topic_s + ref_review_s, cand_topic_s + cand_review_s
+    return {
+        "backend": backend,
+        "processes": processes,
+        "topics": len(topics),
+        "reviews": len(reviews),
+        "cosine_to_reference": {"mean": round(float(cos.mean()), 5), "min": round(float(cos.min()), 5),
+                                "p01": round(float(np.percentile(cos, 1)), 5)},
+        "topic_agreement": round(float(topic_agree.mean()), 4) if len(topic_agree) else 1.0,
+        "review_agreement": round(float(review_agree.mean()), 4) if len(review_agree) else 1.0,
+        "changed_topics": [topics[i] for i in np.flatnonzero(~topic_agree)][:20],
+        "texts_per_s": {"reference": round(n_texts / ref_s, 1) if ref_s else None,
+                        "candidate": round(n_texts / cand_s, 1) if cand_s else None},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, required=True)
+    parser.add_argument("--processes", type=int, default=0, help="Encoder processes for the candidate backend")
+    parser.add_argument("--taxonomy-db", default=TAXONOMY_DB_FILE, help="Topics to check (falls back to a built-in sample)")
+    parser.add_argument("--reviews", type=int, default=1000, help="Fixture reviews used as fast-path queries")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--out", default=None, help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    if os.path.exists(args.taxonomy_db):
+        topics = sorted(TaxonomyStore(args.taxonomy_db).names()) or SAMPLE_TOPICS
+    else:
+        topics = SAMPLE_TOPICS
+    with open(FIXTURE, "r") as f:
+        reviews = [r["content"] for r in json.load(f) if r.get("content")][:args.reviews]
+
+    results = run(args.backend, topics, reviews, args.processes)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    if min(results["topic_agreement"], results["review_agreement"]) < args.min_agreement:
+        raise SystemExit(f"Agreement below {args.min_agreement}: keep EMBEDDING_BACKEND=hf")
@@ -0,0 +1,168 @@
+"""
+Offline stand-ins for the external services the pipeline talks to, used by the benchmarks:
+
+- MockPlayStore.reviews   replaces google_play_scraper.reviews (NEWEST-sorted pages + tokens)
+- mock_chat_groq(...)     replaces langchain_groq.ChatGroq (a Runnable returning JSON answers)
+- MockEmbeddings          replaces langchain_huggingface.HuggingFaceEmbeddings (hashed bag of words)
+
+All of them take latency / error knobs so stage timings reflect the code, not the network.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "2025-12-24.json")
+TOPIC_WORDS = [
+    "delivery", "refund", "payment", "login", "crash", "support", "price", "order", "tracking",
+    "coupon", "restaurant", "quality", "charges", "cancellation", "update", "ads", "location",
+    "notification", "account", "subscription", "late", "cold", "missing", "rude", "slow",
+]
+
+# --- PLAY STORE ---
+class MockPlayStore:
+    """
+    Serves `per_day` reviews per day for `days` days ending at `end`, newest first,
+    in pages of `count` like google_play_scraper. Contents are replayed from the fixture
+    (with a suffix so near-duplicates are not all exact).
+    """
+    def __init__(self, fixture_path: str = FIXTURE, per_day: int = 500, days: int = 3,
+                 end: datetime = None, page_latency: float = 0.0, seed: int = 0):
+        with open(fixture_path, "r") as f:
+            self.contents = [r["content"] for r in json.load(f)]
+        self.per_day = per_day
+        self.days = days
+        self.end = end or datetime(2025, 12, 24, 23, 59, 0)
+        self.page_latency = page_latency
+        self.seed = seed
+        self.total = per_day * days
+        self.pages_served = 0
+        self._lock = threading.Lock()
+
+    def _review(self, i: int) -> Dict:
+        # Review i is i-th newest: spread each day's reviews evenly over 24h
+        at = self.end - timedelta(seconds=int(i * 86400 / self.per_day))
+        rnd = random.Random(self.seed * 1_000_003 + i)
+        content = self.contents[rnd.randrange(len(self.contents))]
+        if rnd.random() < 0.3:
+            content = f"{content} {rnd.choice(TOPIC_WORDS)}"
+        return {"reviewId": f"mock-{i}", "content": content, "score": rnd.randint(1, 5), "at": at}
+
+    def reviews(self, app_id, lang="en", country="in", sort=None, count=200, continuation_token=None, **kwargs):
+        if self.page_latency:
+            time.sleep(self.page_latency)
+        with self._lock:
+            self.pages_served += 1
+        start = continuation_token or 0
+        stop = min(start + count, self.total)
+        page = [self._review(i) for i in range(start, stop)]
+        return page, (stop if stop < self.total else None)
+
+    def dates(self) -> List[str]:
+        return [(self.end - timedelta(days=d)).strftime("%Y-%m-%d") for d in range(self.days)][::-1]
+
+# --- LLM ---
+class MockRateLimitError(Exception):
+    status_code = 429
+
+class MockLLMStats:
+    def __init__(self):
+        self.calls = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def add(self, rate_limited: bool):
+        with self._lock:
+            self.calls += 1
+            self.rate_limited += int(rate_limited)
+
+llm_stats = MockLLMStats()
+
+def _answer(reviews_text: str, vocab: int) -> str:
+    """Deterministic per-review topics: hash the review text into a topic vocabulary of `vocab` phrases."""
+    answer = {}
+    for block in reviews_text.split("---"):
+        match = re.search(r"ID: (\d+)\s*Text: (.*)", block, re.S)
+        if not match:
+            continue
+        review_id, text = match.groups()
+        h = int(hashlib.md5(text.strip().lower().encode()).hexdigest(), 16)
+        if len(text.strip()) < 12:
+            answer[review_id] = [] # Praise like "good app" carries no complaint
+            continue
+        topic_no = h % vocab
+        answer[review_id] = [f"{TOPIC_WORDS[topic_no % len(TOPIC_WORDS)]} issue {topic_no}"]
+    return json.dumps(answer)
+
+def make_mock_chat_groq(latency: float = 0.0, rate_429: float = 0.0, retry_after: float = 0.5,
+                        vocab: int = 200, seed: int = 0):
+    """Returns a ChatGroq replacement: a factory producing Runnables compatible with prompt | llm | parser."""
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    rnd = random.Random(seed)
+    rnd_lock = threading.Lock()
+
+    def factory(temperature=0, model_name=None, groq_api_key=None, http_client=None, **kwargs):
+        def call(prompt_value):
+            with rnd_lock:
+                limited = rnd.random() < rate_429
+            llm_stats.add(limited)
+            if latency:
+                time.sleep(latency)
+            if limited:
+                raise MockRateLimitError(f"Rate limit reached for model {model_name}. Please try again in {retry_after}s")
+            text = prompt_value.to_string()
+            if "Reviews:" in text:
+                return AIMessage(content=_answer(text.split("Reviews:", 1)[1], vocab))
+            return AIMessage(content="- Mock insight about the trend.")
+        return RunnableLambda(call)
+    return factory
+
+# --- EMBEDDINGS ---
+class MockEmbeddings:
+    """Hashed bag-of-words embeddings (dim 384): similar phrases get similar vectors, instantly."""
+    def __init__(self, model_name: str = None, latency_per_text: float = 0.0, dim: int = 384, **kwargs):
+        self.dim = dim
+        self.latency_per_text = latency_per_text
+
+    def _embed(self, text: str) -> List[float]:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            v[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        return [self._embed(t) for t in texts]
+
+def install(store: Optional[MockPlayStore] = None, chat_groq=None, embeddings: bool = True):
+    """Patches the mocks in before the pipeline modules build their clients."""
+    if embeddings:
+        module = types.ModuleType("langchain_huggingface")
+        module.HuggingFaceEmbeddings = MockEmbeddings
+        sys.modules["langchain_huggingface"] = module
+    if chat_groq is not None:
+        try:
+            import langchain_groq
+        except ImportError:
+            langchain_groq = types.ModuleType("langchain_groq")
+            sys.modules["langchain_groq"] = langchain_groq
+        langchain_groq.ChatGroq = chat_groq
+    if store is not None:
+        import scraper
+        scraper.reviews = store.reviews
@@ -0,0 +1,237 @@
+"""
+Offline pipeline benchmark: replays review fixtures through mock Play Store, Groq and
+embedding backends (benchmarks/mocks.py) and times each stage of the pipeline.
+
+Run from backend/:
+    python -m benchmarks.pipeline_bench --profile smoke
+    python -m benchmarks.pipeline_bench --profile large --out bench-large.json
+    python -m benchmarks.pipeline_bench --profile smoke --compare bench-before.json
+
+Stages:
+    fetch            scraper.sync_reviews_for_dates against the paginated mock store
+    process          agent.process_daily_batch for each day (dedup, fast path, packing, LLM, mapping)
+    map_topic        TaxonomyManager.map_extracted_topic against a taxonomy of --topics topics
+    analyze_trends   analyzer.analyze_trends on a synthetic --topics x --trend-days count map
+                     (and appending one more day to an existing TrendMatrix)
+    save_taxonomy    Persisting new topics (add_new_topics + save_taxonomy), bulk (all --topics) and incremental
+
+--real-embeddings keeps the real embedding model (EMBEDDING_BACKEND / EMBEDDING_* env vars
+apply) instead of the hashed mock, so process and map_topic include its cost, which
+dominates CPU time in production; only compare results taken with the same setting.
+
+Everything runs in a throwaway working directory, so the real data/ and taxonomy files
+are never touched. Results are printed (and written with --out) as JSON; --compare prints
+per-stage ratios against an earlier results file, so regressions show up between commits.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import mocks
+
+PROFILES = {
+    # Seconds on a laptop; for checking the harness and quick before/after runs
+    "smoke": {"per_day": 300, "days": 2, "topics": 2000, "trend_days": 14, "map_queries": 200},
+    # The production-scale target: 100k reviews/day, 50k topics, 90 days of trends
+    "large": {"per_day": 100000, "days": 2, "topics": 50000, "trend_days": 90, "map_queries": 2000},
+}
+UNLIMITED = (10 ** 9, 10 ** 12) # Scheduler limits that never throttle the mock LLM
+SAVE_INCREMENT = 100 # Topics appended before the incremental save_taxonomy timing
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def _synthetic_trends(n_topics: int, n_days: int, seed: int = 0):
+    """{date: {topic: count}} with ~30% of topics active per day and a few late spikes."""
+    rng = np.random.default_rng(seed)
+    rates = rng.gamma(0.5, 4.0, n_topics)
+    dates = [f"2025-{1 + d // 28:02d}-{1 + d % 28:02d}" for d in range(n_days)]
+    daily = {}
+    for d, date in enumerate(dates):
+        counts = rng.poisson(rates * (3.0 if d == n_days - 1 else 1.0))
+        active = (rng.random(n_topics) < 0.3) & (counts > 0)
+        daily[date] = {f"synthetic topic {i}": int(counts[i]) for i in np.flatnonzero(active)}
+    return daily
+
+def run(config: dict) -> dict:
+    store = mocks.MockPlayStore(per_day=config["per_day"], days=config["days"],
+                                page_latency=config["page_latency"], seed=config["seed"])
+    mocks.install(
+        store=store,
+        chat_groq=mocks.make_mock_chat_groq(latency=config["llm_latency"], rate_429=config["rate_429"],
+                                            retry_after=config["retry_after"], vocab=config["vocab"],
+                                            seed=config["seed"]),
+        embeddings=not config["real_embeddings"],
+    )
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+    import agent
+    import analyzer
+    import scraper
+    from scheduler import scheduler
+    from store import ReviewStore
+
+    if not config["real_limits"]:
+        scheduler.limits = {m: UNLIMITED for m in scheduler.limits}
+    stages = {}
+    dates = store.dates()
+
+    # 1. Fetch (the scraper's own page cap applies, as in production)
+    review_store = ReviewStore(os.path.join("data", "bench_reviews.db"))
+    reviews_by_date, seconds = _timed(scraper.sync_reviews_for_dates, "com.mock.app", dates, store=review_store)
+    fetched = sum(len(v) for v in reviews_by_date.values())
+    stages["fetch"] = {"seconds": seconds, "reviews": fetched, "pages": store.pages_served,
+                       "reviews_per_s": fetched / seconds if seconds else None}
+
+    # 2. Process each day (taken straight from the mock store, so the page cap does not limit it)
+    generated = {}
+    for i in range(store.total):
+        review = store._review(i)
+        generated.setdefault(review["at"].strftime("%Y-%m-%d"), []).append(
+            {"reviewId": review["reviewId"], "content": review["content"], "score": review["score"]})
+
+    _, init_seconds = _timed(lambda: (agent.get_taxonomy_mgr(), agent.get_agent()))
+    stages["init"] = {"seconds": init_seconds}
+    per_day = {}
+    for date_str in dates:
+        before = mocks.llm_stats.calls
+        counts, seconds = _timed(agent.process_daily_batch, date_str, generated.get(date_str, []))
+        per_day[date_str] = {"seconds": seconds, "reviews": len(generated.get(date_str, [])),
+                             "topics": len(counts), "llm_calls": mocks.llm_stats.calls - before}
+    total_reviews = sum(d["reviews"] for d in per_day.values())
+    total_seconds = sum(d["seconds"] for d in per_day.values())
+    stages["process"] = {"seconds": total_seconds, "reviews": total_reviews,
+                         "reviews_per_s": total_reviews / total_seconds if total_seconds else None,
+                         "per_day": per_day}
+
+    # 3. Grow the taxonomy to --topics with random unit embeddings, then save it in bulk
+    taxonomy_mgr = agent.get_taxonomy_mgr()
+    rng = np.random.default_rng(config["seed"])
+    dim = taxonomy_mgr.embed_batch(["probe"]).shape[1]
+    missing = max(0, config["topics"] - len(taxonomy_mgr.topics))
+    vectors = rng.standard_normal((missing, dim)).astype(np.float32)
+    names = [f"synthetic topic {i}" for i in range(missing)]
+    _, seconds = _timed(lambda: (taxonomy_mgr.add_new_topics(names, vectors), taxonomy_mgr.save_taxonomy()))
+    stages["save_taxonomy_bulk"] = {"seconds": seconds, "topics": missing}
+
+    # 4. Map raw topics one at a time: mostly paraphrases of known topics, some novel
+    rnd = random.Random(config["seed"])
+    queries = [
+        f"{rnd.choice(mocks.TOPIC_WORDS)} issue {rnd.randrange(config['vocab'])}" if rnd.random() < 0.8
+        else f"novel complaint {i} {rnd.choice(mocks.TOPIC_WORDS)}"
+        for i in range(config["map_queries"])
+    ]
+    start = time.perf_counter()
+    for query in queries:
+        taxonomy_mgr.map_extracted_topic(query)
+    seconds = time.perf_counter() - start
+    stages["map_topic"] = {"seconds": seconds, "queries": len(queries), "taxonomy_topics": len(taxonomy_mgr.topics),
+                           "ms_per_query": 1000 * seconds / len(queries) if queries else None}
+
+    # 5. Incremental save: a handful of new topics on top of the large taxonomy
+    vectors = rng.standard_normal((SAVE_INCREMENT, dim)).astype(np.float32)
+    names = [f"incremental topic {i}" for i in range(SAVE_INCREMENT)]
+    _, seconds = _timed(lambda: (taxonomy_mgr.add_new_topics(names, vectors), taxonomy_mgr.save_taxonomy()))
+    stages["save_taxonomy"] = {"seconds": seconds, "topics": SAVE_INCREMENT}
+
+    # 6. Trend analysis over a synthetic topics x days map
+    daily = _synthetic_trends(config["topics"], config["trend_days"], config["seed"])
+    analysis, seconds = _timed(analyzer.analyze_trends, daily)
+    stages["analyze_trends"] = {"seconds": seconds, "topics": len(analysis["trend_matrix"]),
+                                "days": len(analysis["dates"])}
+
+    # 7. Streaming case: one more day added to an existing trend matrix, then re-analyzed
+    trends = analyzer.TrendMatrix.from_daily(daily)
+    last_day = daily[max(daily)] if daily else {}
+    _, seconds = _timed(lambda: (trends.add_day("2099-12-31", last_day), trends.analyze()))
+    stages["analyze_trends_append_day"] = {"seconds": seconds, "topics": len(trends.topics)}
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "stages": stages,
+        "embeddings": agent.get_taxonomy_mgr().embedder.variant if config["real_embeddings"] else "mock",
+        "llm": {"calls": mocks.llm_stats.calls, "rate_limited": mocks.llm_stats.rate_limited,
+                "per_model": agent.get_agent().get_latency_stats()},
+    }
+
+def compare(new: dict, old: dict) -> dict:
+    """Per-stage seconds ratio new/old (> 1 means slower)."""
+    ratios = {}
+    for stage, result in new["stages"].items():
+        before = old.get("stages", {}).get(stage, {}).get("seconds")
+        if before:
+            ratios[stage] = round(result["seconds"] / before, 3)
+    return {"against": old.get("commit"), "ratios": ratios}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="smoke")
+    parser.add_argument("--per-day", type=int, help="Reviews per day served by the mock Play Store")
+    parser.add_argument("--days", type=int, help="Days fetched and processed")
+    parser.add_argument("--topics", type=int, help="Taxonomy size for map/save and topics in the trend map")
+    parser.add_argument("--trend-days", type=int, help="Days in the synthetic analyze_trends input")
+    parser.add_argument("--map-queries", type=int)
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Seconds per mock Play Store page")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per mock LLM call")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of mock LLM calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After seconds in mock 429s")
+    parser.add_argument("--vocab", type=int, default=200, help="Distinct topics the mock LLM returns")
+    parser.add_argument("--real-limits", action="store_true", help="Keep the scheduler's Groq rate limits")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Use the real embedding model (EMBEDDING_BACKEND) instead of the mock")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write results JSON to this path")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    config = dict(PROFILES[args.profile], profile=args.profile)
+    for key in ("per_day", "days", "topics", "trend_days", "map_queries"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    config.update(page_latency=args.page_latency, llm_latency=args.llm_latency, rate_429=args.rate_429,
+                  retry_after=args.retry_after, vocab=args.vocab, real_limits=args.real_limits,
+                  real_embeddings=args.real_embeddings, seed=args.seed)
+
+    out_path = os.path.abspath(args.out) if args.out else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    # store.py and the taxonomy use relative paths: run inside a scratch directory
+    with tempfile.TemporaryDirectory(prefix="pipeline_bench_") as workdir:
+        os.chdir(workdir)
+        os.makedirs("data", exist_ok=True)
+        results = run(config)
+        os.chdir(BACKEND_DIR)
+
+    if compare_path:
+        with open(compare_path, "r") as f:
+            results["compare"] = compare(results, json.load(f))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if out_path:
+        with open(out_path, "w") as f:
+            f.write(output)
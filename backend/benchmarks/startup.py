@@ -0,0 +1,61 @@
+"""
+Startup-time benchmark: how long a fresh process takes to import the API module
+(what uvicorn does before it can answer "/"), and optionally how long warm-up takes.
+
+Run from backend/:
+    python -m benchmarks.startup --runs 5 --max-import-seconds 2.0
+
+Exits non-zero if the median import time exceeds --max-import-seconds, so it can
+gate CI against import-time regressions (e.g. a heavy library imported at module level).
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import main; "
+    "print(time.perf_counter() - t)"
+)
+WARM_SNIPPET = (
+    "import time; import main, agent; t = time.perf_counter(); agent.warm_up(); "
+    "print(time.perf_counter() - t)"
+)
+# Modules that must NOT be loaded by `import main`
+HEAVY_MODULES = ["torch", "sentence_transformers", "langchain_groq", "langchain_huggingface", "pandas", "sklearn"]
+LEAK_SNIPPET = (
+    "import sys, json; import main; "
+    f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+)
+
+def _run(snippet: str) -> str:
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+    # Modules print progress lines; the measurement is the last line
+    return out.stdout.strip().splitlines()[-1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=None)
+    parser.add_argument("--warm", action="store_true", help="Also time agent.warm_up() (loads models)")
+    parser.add_argument("--out", default=None, help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    import_times = [float(_run(IMPORT_SNIPPET)) for _ in range(args.runs)]
+    results = {
+        "import_main_median_s": statistics.median(import_times),
+        "import_main_runs_s": import_times,
+        "heavy_modules_loaded": json.loads(_run(LEAK_SNIPPET)),
+    }
+    if args.warm:
+        results["warm_up_s"] = float(_run(WARM_SNIPPET))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+
+    if args.max_import_seconds is not None and results["import_main_median_s"] > args.max_import_seconds:
+        sys.exit(f"Import time regression: {results['import_main_median_s']:.2f}s > {args.max_import_seconds}s")
@@ -0,0 +1,110 @@
+"""
+Offline taxonomy compaction: merges near-duplicate topics ("No refund" / "Refund Issue")
+that each missed SIMILARITY_THRESHOLD when they were first extracted.
+
+Run from backend/ (e.g. nightly from cron). Merges cannot be undone, so this is
+deliberately not exposed on the API:
+    python compaction.py --dry-run
+    python compaction.py --threshold 0.7
+
+Topics are clustered greedily: the most used topic (by cached daily counts, then the
+oldest) becomes canonical and absorbs every unassigned topic within `threshold` of it,
+so clusters never chain through intermediate topics. Merges are recorded in the store's
+merge table, cached daily counts are carried over to the new taxonomy version through
+it, and later phrasings close to a merged alias keep mapping to its canonical topic.
+"""
+import argparse
+import json
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+import agent
+from store import topic_cache
+
+COMPACTION_THRESHOLD = 0.70 # Below agent.SIMILARITY_THRESHOLD: those pairs never merged online
+MIN_COMPACTION_THRESHOLD = 0.5 # Lower thresholds merge unrelated topics (0 merges everything)
+BLOCK_SIZE = 1024 # Rows per similarity block (BLOCK_SIZE x n_topics floats in memory)
+
+def find_neighbors(matrix: np.ndarray, threshold: float) -> List[List[Tuple[int, float]]]:
+    """For each row, [(other row, cosine)] with cosine >= threshold, scored block by block."""
+    neighbors = [[] for _ in range(len(matrix))]
+    for start in range(0, len(matrix), BLOCK_SIZE):
+        scores = matrix[start:start + BLOCK_SIZE] @ matrix.T
+        rows, cols = np.nonzero(scores >= threshold)
+        for i, j in zip(rows, cols):
+            if start + i != j:
+                neighbors[start + i].append((int(j), float(scores[i, j])))
+    return neighbors
+
+def plan_merges(names: List[str], matrix: np.ndarray, usage: Dict[str, int],
+                threshold: float = COMPACTION_THRESHOLD) -> Dict[str, Tuple[str, float]]:
+    """Returns {alias: (canonical, similarity)}; canonical topics are never aliases themselves."""
+    if not names:
+        return {}
+    neighbors = find_neighbors(matrix, threshold)
+    priority = sorted(range(len(names)), key=lambda i: (-usage.get(names[i], 0), i))
+
+    assigned = set()
+    merges = {}
+    for leader in priority:
+        if leader in assigned:
+            continue
+        assigned.add(leader)
+        for other, score in neighbors[leader]:
+            if other not in assigned:
+                assigned.add(other)
+                merges[names[other]] = (names[leader], score)
+    return merges
+
+def compact_taxonomy(threshold: float = COMPACTION_THRESHOLD, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Plans (and unless dry_run, applies) a compaction of the shared taxonomy.
+    Returns a report: topic counts before/after, the merges, and cache entries carried over.
+    Raises ValueError for a threshold outside [MIN_COMPACTION_THRESHOLD, 1].
+    """
+    if not MIN_COMPACTION_THRESHOLD <= threshold <= 1.0:
+        raise ValueError(f"threshold must be between {MIN_COMPACTION_THRESHOLD} and 1.0, got {threshold}")
+    taxonomy_mgr = agent.get_taxonomy_mgr()
+    # Version read with the snapshot: another worker may have bumped the revision since our last refresh
+    names, matrix, old_version = taxonomy_mgr.snapshot()
+    usage = topic_cache.topic_totals(old_version)
+
+    merges = plan_merges(names, matrix, usage, threshold)
+    print(f"[COMPACTION] {len(names)} topics, {len(merges)} merge(s) planned at threshold {threshold}.")
+    report = {
+        "threshold": threshold,
+        "dry_run": dry_run,
+        "topics_before": len(names),
+        "merges": {alias: {"into": canonical, "similarity": round(score, 3)} for alias, (canonical, score) in merges.items()},
+    }
+    if dry_run or not merges:
+        report["topics_after"] = len(names) - len(merges)
+        return report
+
+    # 1. Rewrite the taxonomy (one store transaction; other workers reload on the new epoch)
+    applied = taxonomy_mgr.apply_merges(merges)
+
+    # 2. New taxonomy version, with cached daily counts renamed through the merges
+    taxonomy_mgr.bump_revision()
+    new_version = taxonomy_mgr.version
+    aliases = {alias: canonical for alias, (canonical, _) in applied.items()}
+    carried = topic_cache.remap(old_version, new_version, aliases)
+    removed = topic_cache.invalidate(keep_version=new_version)
+    print(f"[COMPACTION] Carried {carried} cached day(s) over to {new_version}; dropped {removed} stale entries.")
+
+    report.update({
+        "merges": {alias: report["merges"][alias] for alias in applied},
+        "topics_after": len(taxonomy_mgr.topics),
+        "taxonomy_version": new_version,
+        "cached_days_remapped": carried
+    })
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=COMPACTION_THRESHOLD)
+    parser.add_argument("--dry-run", action="store_true", help="Only print the planned merges")
+    args = parser.parse_args()
+    if not MIN_COMPACTION_THRESHOLD <= args.threshold <= 1.0:
+        parser.error(f"--threshold must be between {MIN_COMPACTION_THRESHOLD} and 1.0")
+    print(json.dumps(compact_taxonomy(args.threshold, args.dry_run), indent=2))
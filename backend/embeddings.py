@@ -0,0 +1,175 @@
+"""
+Pluggable text embedding backends for TaxonomyManager.
+
+EMBEDDING_BACKEND selects how all-MiniLM-L6-v2 runs:
+    hf     langchain HuggingFaceEmbeddings on full-precision torch (default, the reference)
+    onnx   sentence-transformers on ONNX Runtime (pip install "sentence-transformers[onnx]");
+           set EMBEDDING_ONNX_FILE to a quantized export, e.g. onnx/model_qint8_avx512.onnx
+    int8   the torch model with its Linear layers dynamically quantized to int8 (no extra deps)
+
+Check that topic assignments stay stable before switching:
+    python -m benchmarks.embedding_accuracy --backend int8
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+import metrics
+
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "hf") # "hf" | "onnx" | "int8"
+EMBEDDING_ONNX_FILE = os.environ.get("EMBEDDING_ONNX_FILE") # Default: the repo's onnx/model.onnx
+EMBEDDING_PROCESSES = int(os.environ.get("EMBEDDING_PROCESSES", "0")) # Encoder processes; 0/1 = in-process
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "20000")) # Vectors kept (~1.5KB each)
+ENCODE_BATCH_SIZE = 64 # Texts per forward pass
+POOL_MIN_TEXTS = 512 # Smaller batches are encoded in-process (pickling costs more than it saves)
+
+# --- BACKENDS ---
+class HuggingFaceBackend:
+    """The original setup: langchain's HuggingFaceEmbeddings (sentence-transformers on torch)."""
+    def __init__(self, model_name: str):
+        # Deferred import: pulls in torch + sentence-transformers
+        from langchain_huggingface import HuggingFaceEmbeddings
+        self.model = HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": ENCODE_BATCH_SIZE})
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.embed_documents(texts), dtype=np.float32)
+
+class SentenceTransformerBackend:
+    """sentence-transformers directly: ONNX Runtime (onnx) or dynamically quantized torch (int8)."""
+    def __init__(self, model_name: str, kind: str):
+        from sentence_transformers import SentenceTransformer
+        if kind == "onnx":
+            model_kwargs = {"file_name": EMBEDDING_ONNX_FILE} if EMBEDDING_ONNX_FILE else {}
+            self.model = SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+        else:
+            import torch
+            model = SentenceTransformer(model_name, device="cpu")
+            self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True), dtype=np.float32)
+
+BACKENDS = ("hf", "onnx", "int8")
+
+def make_backend(kind: str, model_name: str):
+    if kind == "hf":
+        return HuggingFaceBackend(model_name)
+    if kind in ("onnx", "int8"):
+        return SentenceTransformerBackend(model_name, kind)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{kind}' (expected one of {', '.join(BACKENDS)})")
+
+# --- Encoder processes ---
+# Each worker process loads its own copy of the model once (initializer), then encodes chunks.
+_worker_backend = None
+
+def _init_worker(kind: str, model_name: str, threads: int):
+    global _worker_backend
+    try:
+        import torch
+        torch.set_num_threads(threads) # Workers split the cores instead of oversubscribing them
+    except ImportError:
+        pass
+    _worker_backend = make_backend(kind, model_name)
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_backend.encode(texts)
+
+# --- EMBEDDER ---
+class Embedder:
+    """
+    Batched encoding with a content-hash cache in front of a backend.
+
+    Texts are deduplicated per call and looked up by hash, so repeated topic phrasings and
+    re-processed reviews are never encoded twice. Misses are encoded in one batch, split
+    across `processes` encoder processes when the batch is large. Vectors are L2-normalized.
+    """
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", kind: str = EMBEDDING_BACKEND,
+                 processes: int = EMBEDDING_PROCESSES, cache_size: int = EMBEDDING_CACHE_SIZE):
+        self.model_name = model_name
+        self.kind = kind
+        self.processes = processes
+        self.cache_size = cache_size
+        self.backend = make_backend(kind, model_name)
+        # Identifies the vectors this embedder produces (which ONNX export, if any)
+        self.variant = f"{kind}:{EMBEDDING_ONNX_FILE}" if kind == "onnx" and EMBEDDING_ONNX_FILE else kind
+        self._pool = None
+        self._cache = OrderedDict() # content hash -> normalized vector
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32, L2-normalized; row i embeds texts[i]."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = vector
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = _normalize(self._encode(list(missing.values())))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._remember(key, vector)
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        metrics.inc("embedded_texts_total", len(missing))
+        metrics.inc("embedding_cache_hits_total", len(texts) - len(missing))
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cached": len(self._cache)}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if self.processes <= 1 or len(texts) < POOL_MIN_TEXTS:
+            return self.backend.encode(texts)
+        pool = self._get_pool()
+        step = -(-len(texts) // self.processes)
+        chunks = [texts[i:i + step] for i in range(0, len(texts), step)]
+        return np.vstack(list(pool.map(_encode_in_worker, chunks)))
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: forking a process that already runs torch threads can deadlock
+                threads = max(1, (os.cpu_count() or 1) // self.processes)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.kind, self.model_name, threads)
+                )
+            return self._pool
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = vector.copy() # Not a view: evicting it must free the memory
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
@@ -0,0 +1,53 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import pipeline
+from store import JobStore, job_store
+
+JOB_WORKERS = 4 # Analyses running at once; LLM calls are still paced by the shared scheduler
+JOB_TTL_SECONDS = 3600 # Finished jobs are kept this long for polling
+
+# --- BACKGROUND ANALYSIS JOBS ---
+class JobManager:
+    """
+    Runs analyze_app on a worker pool. Each job records per-day topic counts as they
+    finish, so GET /jobs/{id} can show partial results before the job completes.
+    Job state is persisted in the JobStore (reviews.db), so any worker process can
+    answer a poll; the job itself runs in the process that accepted it.
+    """
+    def __init__(self, max_workers: int = JOB_WORKERS, store: JobStore = job_store):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.store = store
+
+    def submit(self, app_name: str, dates: List[str]) -> str:
+        self.store.prune(JOB_TTL_SECONDS)
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, app_name, dates) # queued -> running -> done | failed
+        self._pool.submit(self._run, job_id, app_name, dates)
+        print(f"[JOBS] Queued {job_id} for '{app_name}' on {dates}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def _run(self, job_id: str, app_name: str, dates: List[str]):
+        self.store.update(job_id, status="running")
+        partial = {} # {date: {topic: count}} for days already processed
+        partial_lock = threading.Lock()
+
+        def day_done(date_str: str, counts: Dict[str, int]):
+            with partial_lock:
+                partial[date_str] = dict(counts)
+                self.store.update(job_id, partial=partial)
+
+        try:
+            result = pipeline.analyze_app(app_name, dates, on_day_done=day_done)
+            self.store.update(job_id, status="done", result=result)
+        except Exception as e:
+            print(f"[ERROR] Job {job_id} failed: {e}")
+            self.store.update(job_id, status="failed", error=str(e))
+
+# --- Singleton Instance ---
+job_manager = JobManager()
@@ -1,16 +1,32 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List
+from datetime import date
 import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+import json
 import os
+import threading
+import time
 
 # Internal modules
-import scraper
 import agent
 import analyzer
+import metrics
+import pipeline
+from jobs import job_manager
 
-app = FastAPI(title="PulseGen - AI App Review Analyzer")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model + LLM clients off the request path; "/" answers immediately
+    threading.Thread(target=agent.warm_up, daemon=True).start()
+    yield
+
+app = FastAPI(title="PulseGen - AI App Review Analyzer", lifespan=lifespan)
 
 # CORS (Allow Frontend)
 app.add_middleware(
@@ -23,74 +39,154 @@ app.add_middleware(
 
 class AnalyzeRequest(BaseModel):
     app_name: str
-    dates: List[str] # e.g. ["2025-01-01", "2025-01-02"]
+    dates: List[date] # e.g. ["2025-01-01", "2025-01-02"]; anything else is rejected with 422
+
+    @property
+    def date_strs(self) -> List[str]:
+        """Dates as "YYYY-MM-DD", the form the pipeline, review store and caches use."""
+        return [d.isoformat() for d in self.dates]
+
+class BatchAnalyzeRequest(BaseModel):
+    apps: List[AnalyzeRequest] # Each app with its own dates
 
 @app.get("/")
 def health_check():
+    """Liveness: the process is up and serving."""
     return {"status": "ok", "service": "PulseGen Backend"}
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness: models and taxonomy are loaded, so /analyze will not block on warm-up."""
+    if agent.is_ready():
+        return {"status": "ready"}
+    error = agent.init_error()
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error" if error else "starting", "detail": error}
+    )
+
+@app.get("/stats/llm")
+def llm_stats():
+    """Per-model LLM call counts and latency since startup (empty while warming up)."""
+    if not agent.is_ready():
+        return {}
+    return agent.get_agent().get_latency_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text format: per-stage latency histograms and LLM/scrape/embedding counters."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/taxonomy/invalidate")
+def invalidate_taxonomy():
+    """Call after editing the taxonomy so cached daily topic counts are recomputed."""
+    version = agent.invalidate_taxonomy_cache()
+    return {"status": "ok", "taxonomy_version": version}
+
 @app.post("/analyze")
-async def analyze_reviews(req: AnalyzeRequest):
-    print(f"[API] Received analysis request for '{req.app_name}' on {req.dates}")
+async def analyze_reviews(req: AnalyzeRequest, timings: bool = False):
+    """`?timings=true` adds a per-stage timing breakdown ("timings") to the response."""
+    print(f"[API] Received analysis request for '{req.app_name}' on {req.date_strs}")
+    
+    # Scraping, embedding and LLM calls all block; keep them off the event loop
+    try:
+        return await run_in_threadpool(pipeline.analyze_app, req.app_name, req.date_strs, timings=timings)
+    except pipeline.AppNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def ndjson_stream(work: Callable[[Callable[[Dict[str, Any]], None]], None], name: str) -> StreamingResponse:
+    """
+    Runs the blocking `work(emit)` on a worker thread and streams each event it emits as
+    one NDJSON line. An exception escaping `work` ends the stream with an error event.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
     
-    # 1. Mock Mode
-    if req.app_name == "TEST":
-        return {
-            "topics": ["Delivery delay", "Cold food", "App crashes"],
-            "trend": {
-                "Delivery delay": [12, 8],
-                "Cold food": [5, 1],
-                "App crashes": [2, 4]
-            },
-            "dates": req.dates if req.dates else ["2025-01-01", "2025-01-02"],
-            "newTopics": ["Stories not uploading"],
-            "spikes": ["App crashes"],
-            "insights": "Users recently experienced more app crashes (spike detected), increasing by 200%. 'Stories not uploading' emerged as a new issue on the last day."
-        }
-
-    # 2. Search App
-    app_id = scraper.search_app_id(req.app_name)
-    if not app_id:
-        raise HTTPException(status_code=404, detail=f"App '{req.app_name}' not found on Play Store.")
+    def emit(event):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
     
-    # 3. Scrape & Agent Loop
-    daily_stats_map = {}
+    def run():
+        try:
+            work(emit)
+        except Exception as e:
+            print(f"[ERROR] {name} failed: {e}")
+            emit({"type": "error", "status": 500, "detail": str(e)})
+        finally:
+            emit(None)
     
-    for date_str in req.dates:
-        # Fetch for this specific day
-        # We assume fetch_reviews_for_date_range works for single day if start=end
-        reviews = scraper.fetch_reviews_for_date_range(app_id, date_str, date_str)
+    loop.run_in_executor(None, run)
+    
+    async def events():
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/analyze/stream")
+async def analyze_reviews_stream(req: AnalyzeRequest, timings: bool = False):
+    """
+    Streaming variant of /analyze (NDJSON, one JSON object per line):
+      {"type": "day", "date": ..., "counts": {...}, <trend snapshot over days so far>}
+      ...
+      {"type": "done", "result": <same body as /analyze>}   (or {"type": "error", ...})
+    """
+    print(f"[API] Received streaming analysis request for '{req.app_name}' on {req.date_strs}")
+    
+    def work(emit):
+        trends = analyzer.TrendMatrix() # Each finished day is added in place, not rebuilt
+        
+        def day_done(date_str: str, counts: Dict[str, int]):
+            trends.add_day(date_str, counts)
+            emit({"type": "day", "date": date_str, "counts": counts, **pipeline.trend_snapshot(trends)})
         
-        if not reviews:
-            daily_stats_map[date_str] = {}
-            continue
-            
-        # Process with Agent
-        # daily_topics = { "Topic A": 5, ... }
-        daily_topics = agent.process_daily_batch(date_str, reviews)
-        daily_stats_map[date_str] = daily_topics
-
-    # 4. Analyze Trends
-    # Returns { "trend_matrix": ..., "new_topics": ..., "spikes": ..., "dates": ... }
-    analysis_result = analyzer.analyze_trends(daily_stats_map)
+        try:
+            result = pipeline.analyze_app(req.app_name, req.date_strs, on_day_done=day_done, timings=timings)
+            emit({"type": "done", "result": result})
+        except pipeline.AppNotFoundError as e:
+            emit({"type": "error", "status": 404, "detail": str(e)})
     
-    # 5. Generate Insights
-    # We pass the sorted trend matrix (top 5 are usually enough for insights contextualization)
-    insight_text = agent.generate_insights_for_period(
-        analysis_result["trend_matrix"],
-        analysis_result["new_topics"],
-        analysis_result["spikes"]
-    )
+    return ndjson_stream(work, "Streaming analysis")
+
+@app.post("/analyze/batch")
+async def analyze_reviews_batch(req: BatchAnalyzeRequest, timings: bool = False):
+    """
+    Portfolio refresh (NDJSON, one JSON object per line), apps analyzed concurrently:
+      {"type": "app", "index": i, "app_name": ..., "status": "ok", "seconds": ..., "result": <as /analyze>}
+      {"type": "app", "index": i, "app_name": ..., "status": "not_found" | "error", "detail": ...}
+      ...
+      {"type": "done", "apps": n, "failed": k, "seconds": ...}
+    App events arrive in completion order; `index` is the app's position in the request.
+    """
+    print(f"[API] Received batch analysis request for {len(req.apps)} app(s)")
+    
+    def work(emit):
+        start = time.perf_counter()
+        entries = pipeline.analyze_apps(
+            [(a.app_name, a.date_strs) for a in req.apps],
+            on_app_done=lambda idx, entry: emit({"type": "app", "index": idx, **entry}),
+            timings=timings
+        )
+        failed = sum(1 for e in entries if e["status"] != "ok")
+        emit({"type": "done", "apps": len(entries), "failed": failed, "seconds": round(time.perf_counter() - start, 2)})
     
-    # 6. Final Response
-    return {
-        "topics": list(analysis_result["trend_matrix"].keys()), # All topics sorted by volume
-        "trend": analysis_result["trend_matrix"],               # {Topic: [d1, d2, ...]}
-        "dates": analysis_result["dates"],                      # [d1, d2, ...]
-        "newTopics": analysis_result["new_topics"],
-        "spikes": analysis_result["spikes"],
-        "insights": insight_text
-    }
+    return ndjson_stream(work, "Batch analysis")
+
+@app.post("/jobs/analyze", status_code=202)
+def submit_analysis_job(req: AnalyzeRequest):
+    """Queues an analysis and returns immediately; poll GET /jobs/{job_id}."""
+    job_id = job_manager.submit(req.app_name, req.date_strs)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+def get_analysis_job(job_id: str):
+    """Job status, per-day partial topic counts, and the final result once done."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
 
 if __name__ == "__main__":
     import os
@@ -0,0 +1,187 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+# Histogram buckets (seconds): scrape pages and LLM calls sit in the 0.1s-10s range
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "pulsegen"
+
+def _label_key(labels: Dict[str, Any]) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+# --- 1. PROCESS-WIDE METRICS ---
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms rendered in the Prometheus text format.
+    Hand-rolled to avoid a prometheus_client dependency for a handful of series.
+    """
+    def __init__(self):
+        self._counters = {} # name -> {label_key: value}
+        self._histograms = {} # name -> {label_key: [bucket_counts, sum, count]}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = [[0] * len(BUCKETS), 0.0, 0]
+            idx = bisect.bisect_left(BUCKETS, seconds)
+            if idx < len(BUCKETS):
+                hist[0][idx] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{PREFIX}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = f"{PREFIX}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, (buckets, total, count) in sorted(series.items()):
+                    cumulative = 0
+                    for le, n in zip(BUCKETS, buckets):
+                        cumulative += n
+                        lines.append(f"{full}_bucket{_format_labels(key, (('le', f'{le:g}'),))} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {total:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+# --- 2. PER-REQUEST TRACE ---
+class Trace:
+    """Spans recorded while one analysis runs; summarized into the /analyze timing breakdown."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = [] # [{"stage", "ms", **labels}]
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, labels: Dict[str, Any]):
+        with self._lock:
+            self.spans.append({"stage": stage, "ms": round(seconds * 1000, 2), **labels})
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        {"total_ms", "stages": {stage: {count, total_ms, max_ms}}, "llm": {model: {...}}}.
+        Stages can overlap (LLM calls run concurrently), so their totals may exceed total_ms.
+        """
+        stages, llm = {}, {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            s = stages.setdefault(span["stage"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += span["ms"]
+            s["max_ms"] = max(s["max_ms"], span["ms"])
+            if span["stage"] == "llm_call":
+                m = llm.setdefault(span.get("model"), {"calls": 0, "tokens": 0, "rate_limited": 0, "errors": 0, "total_ms": 0.0})
+                m["calls"] += 1
+                m["tokens"] += span.get("tokens", 0)
+                m["rate_limited"] += int(span.get("outcome") == "rate_limited")
+                m["errors"] += int(span.get("outcome") == "error")
+                m["total_ms"] += span["ms"]
+        for s in list(stages.values()) + list(llm.values()):
+            s["total_ms"] = round(s["total_ms"], 1)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages": stages,
+            "llm": llm
+        }
+
+_current_trace = contextvars.ContextVar("pulsegen_trace", default=None)
+
+@contextmanager
+def trace():
+    """Collects spans from this thread (and pools submitted via `propagate`) into a Trace."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+def propagate(fn):
+    """Wraps `fn` to run in a copy of the caller's context, so pool threads report to its trace."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+# --- 3. SPANS ---
+class Span:
+    """Mutable handle for labels only known at the end of a span (outcome, sizes)."""
+    def __init__(self, labels: Dict[str, Any]):
+        self.labels = labels
+
+    def set(self, **labels):
+        self.labels.update(labels)
+
+# Labels that identify a histogram series; everything else only goes to the request trace
+SERIES_LABELS = ("model", "outcome", "chain")
+
+@contextmanager
+def span(stage: str, classify: Callable[[Exception], str] = None, **labels):
+    """
+    Times a block: observed into the `stage_seconds` histogram (by stage, plus model /
+    outcome / chain labels where given) and appended to the current request trace.
+    If the block raises, `outcome` is set to classify(exc) (default "error").
+    """
+    handle = Span(dict(labels))
+    start = time.perf_counter()
+    try:
+        yield handle
+    except Exception as e:
+        handle.labels.setdefault("outcome", classify(e) if classify else "error")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        series = {k: v for k, v in handle.labels.items() if k in SERIES_LABELS}
+        registry.observe("stage_seconds", elapsed, stage=stage, **series)
+        current = _current_trace.get()
+        if current is not None:
+            current.add(stage, elapsed, handle.labels)
+
+def inc(name: str, value: float = 1, **labels):
+    registry.inc(name, value, **labels)
+
+# --- Singleton Instance ---
+registry = MetricsRegistry()
+registry.describe("stage_seconds", "Time spent per pipeline stage (search, scrape_page, llm_call, embed_batch, ...).")
+registry.describe("llm_calls_total", "LLM calls by model and outcome (ok, rate_limited, error).")
+registry.describe("llm_tokens_total", "Estimated tokens sent per model (prompt + budgeted output).")
+registry.describe("llm_fallbacks_total", "Calls answered by a model other than the first one tried.")
+registry.describe("embedded_texts_total", "Strings encoded by the embedding backend (cache misses).")
+registry.describe("embedding_cache_hits_total", "Strings served from the content-hash embedding cache.")
+registry.describe("scraped_reviews_total", "Reviews fetched from the Play Store.")
+registry.describe("app_id_lookups_total", "App name resolutions, by outcome (hit: served from the app id cache).")
+registry.describe("analyze_requests_total", "Analyses run, by outcome.")
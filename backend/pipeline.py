@@ -0,0 +1,193 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Tuple
+
+# Internal modules
+import scraper
+import agent
+import analyzer
+import metrics
+from store import review_store, topic_cache
+
+BATCH_WORKERS = 4 # Apps analyzed at once in a batch; their LLM calls share one extraction pool and scheduler
+
+class AppNotFoundError(Exception):
+    pass
+
+def mock_analysis(dates: List[str]) -> Dict[str, Any]:
+    """Instant canned response for app_name == "TEST" (saves API tokens during UI testing)."""
+    return {
+        "topics": ["Delivery delay", "Cold food", "App crashes"],
+        "trend": {
+            "Delivery delay": [12, 8],
+            "Cold food": [5, 1],
+            "App crashes": [2, 4]
+        },
+        "dates": dates if dates else ["2025-01-01", "2025-01-02"],
+        "newTopics": ["Stories not uploading"],
+        "spikes": ["App crashes"],
+        "rollingSpikes": [],
+        "insights": "Users recently experienced more app crashes (spike detected), increasing by 200%. 'Stories not uploading' emerged as a new issue on the last day."
+    }
+
+def trend_snapshot(trends: analyzer.TrendMatrix) -> Dict[str, Any]:
+    """Response-shaped trend view (no insights) over the days added to `trends` so far."""
+    analysis_result = trends.analyze()
+    return {
+        "topics": list(analysis_result["trend_matrix"].keys()),
+        "trend": analysis_result["trend_matrix"],
+        "dates": analysis_result["dates"],
+        "newTopics": analysis_result["new_topics"],
+        "spikes": analysis_result["spikes"],
+        "rollingSpikes": analysis_result["rolling_spikes"]
+    }
+
+def analyze_app(app_name: str, dates: List[str],
+                on_day_done: Callable[[str, Dict[str, int]], None] = None,
+                timings: bool = False) -> Dict[str, Any]:
+    """
+    Full synchronous analysis pipeline: search -> sync reviews -> extract/map per day
+    -> trends -> insights. Blocking; run it on a worker thread, never on the event loop.
+    `on_day_done(date, counts)` fires as each date's topic counts become available.
+    With `timings=True` the response includes a per-stage timing breakdown.
+    Raises AppNotFoundError if the app cannot be resolved, ValueError for a malformed date.
+    """
+    dates = scraper.normalize_dates(dates)
+
+    # 1. Mock Mode
+    if app_name == "TEST":
+        return mock_analysis(dates)
+
+    with metrics.trace() as trace:
+        try:
+            result = _run_analysis(app_name, dates, on_day_done)
+        except AppNotFoundError:
+            metrics.inc("analyze_requests_total", outcome="not_found")
+            raise
+        except Exception:
+            metrics.inc("analyze_requests_total", outcome="error")
+            raise
+    metrics.inc("analyze_requests_total", outcome="ok")
+
+    if timings:
+        result["timings"] = trace.summary() # {total_ms, stages: {...}, llm: {model: {...}}}
+    return result
+
+def _run_analysis(app_name: str, dates: List[str],
+                  on_day_done: Callable[[str, Dict[str, int]], None]) -> Dict[str, Any]:
+    # 2. Search App
+    app_id = scraper.search_app_id(app_name)
+    if not app_id:
+        raise AppNotFoundError(f"App '{app_name}' not found on Play Store.")
+
+    # 3. Scrape & Agent Loop
+    trends = analyzer.TrendMatrix() # Filled one day at a time as days finish
+
+    def day_done(date_str: str, daily_topics: Dict[str, int]):
+        trends.add_day(date_str, daily_topics)
+        if on_day_done:
+            on_day_done(date_str, daily_topics)
+
+    # Sync the local store (only new reviews hit the Play Store), then read the dates from disk
+    with metrics.span("sync_reviews"):
+        reviews_by_date = scraper.sync_reviews_for_dates(app_id, dates)
+
+    # Pick up revisions bumped by other workers before trusting cached days
+    taxonomy_mgr = agent.get_taxonomy_mgr()
+    taxonomy_mgr.refresh()
+    taxonomy_version = taxonomy_mgr.version
+    pending = {}
+
+    for date_str in dates:
+        # Finished past days are served from the daily topic cache
+        cached = topic_cache.get(app_id, date_str, taxonomy_version)
+        if cached is not None:
+            print(f"[CACHE] Hit for {app_id} on {date_str}")
+            day_done(date_str, cached)
+            continue
+
+        reviews = reviews_by_date.get(date_str, [])
+
+        if not reviews:
+            day_done(date_str, {})
+            continue
+
+        pending[date_str] = reviews
+
+    failed_dates = set() # Dates with a chunk whose extraction failed (incomplete counts)
+
+    def processed(date_str: str, daily_topics: Dict[str, int]):
+        # Only cache days whose reviews can no longer change and were fully extracted
+        if date_str not in failed_dates and review_store.is_day_complete(app_id, date_str):
+            topic_cache.put(app_id, date_str, taxonomy_version, daily_topics)
+        day_done(date_str, daily_topics)
+
+    # Process with Agent (chunks from all pending dates run concurrently)
+    prefilter_stats = {}
+    with metrics.span("process_batches", reviews=sum(len(r) for r in pending.values())):
+        agent.process_batches(pending, on_date_done=processed, stats=prefilter_stats, failed=failed_dates)
+
+    # 4. Analyze Trends
+    # Returns { "trend_matrix": ..., "new_topics": ..., "spikes": ..., "rolling_spikes": ..., "dates": ... }
+    with metrics.span("analyze_trends"):
+        analysis_result = trends.analyze()
+
+    # 5. Generate Insights
+    # We pass the sorted trend matrix (top 5 are usually enough for insights contextualization)
+    with metrics.span("insights"):
+        insight_text = agent.generate_insights_for_period(
+            analysis_result["trend_matrix"],
+            analysis_result["new_topics"],
+            analysis_result["spikes"]
+        )
+
+    # 6. Final Response
+    return {
+        "topics": list(analysis_result["trend_matrix"].keys()), # All topics sorted by volume
+        "trend": analysis_result["trend_matrix"],               # {Topic: [d1, d2, ...]}
+        "dates": analysis_result["dates"],                      # [d1, d2, ...]
+        "newTopics": analysis_result["new_topics"],
+        "spikes": analysis_result["spikes"],
+        "rollingSpikes": analysis_result["rolling_spikes"],       # Last day >= 3 std above its 7-day baseline
+        "insights": insight_text,
+        "prefilterStats": prefilter_stats                       # {date: {reviews, sent, tokens_saved, ...}}
+    }
+
+def analyze_apps(apps: List[Tuple[str, List[str]]],
+                 on_app_done: Callable[[int, Dict[str, Any]], None] = None,
+                 timings: bool = False) -> List[Dict[str, Any]]:
+    """
+    Portfolio refresh: analyzes several (app_name, dates) pairs concurrently. While one
+    app is scraping, another's chunks are already queued on the shared extraction pool,
+    so the batch is bounded by the LLM rate limits rather than the sum of per-app times.
+    `on_app_done(index, entry)` fires as each app finishes. Returns one entry per app,
+    in input order:
+      {"app_name", "status": "ok" | "not_found" | "error", "seconds", "result" | "detail"}
+    """
+    entries = [None] * len(apps)
+    if not apps:
+        return entries
+
+    def run(app_name: str, dates: List[str]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        entry = {"app_name": app_name}
+        try:
+            entry.update(status="ok", result=analyze_app(app_name, dates, timings=timings))
+        except AppNotFoundError as e:
+            entry.update(status="not_found", detail=str(e))
+        except Exception as e:
+            print(f"[ERROR] Batch analysis of '{app_name}' failed: {e}")
+            entry.update(status="error", detail=str(e))
+        entry["seconds"] = round(time.perf_counter() - start, 2)
+        return entry
+
+    print(f"[BATCH] Analyzing {len(apps)} app(s), {min(BATCH_WORKERS, len(apps))} at a time")
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(apps)), thread_name_prefix="batch") as pool:
+        futures = {pool.submit(run, app_name, dates): idx for idx, (app_name, dates) in enumerate(apps)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            entries[idx] = future.result()
+            print(f"[BATCH] {entries[idx]['app_name']}: {entries[idx]['status']} in {entries[idx]['seconds']}s")
+            if on_app_done:
+                on_app_done(idx, entries[idx])
+    return entries
@@ -0,0 +1,114 @@
+import re
+import unicodedata
+import zlib
+import numpy as np
+from typing import Dict, List, Tuple
+
+MIN_CONTENT_LENGTH = 4 # Shorter reviews ("ok", "👍") carry no topic
+NEAR_DUP_THRESHOLD = 0.8 # Estimated Jaccard similarity of character shingles
+NEAR_DUP_MIN_LENGTH = 20 # Shorter texts only merge on exact normalized match
+SHINGLE_SIZE = 4
+NUM_PERM = 64 # MinHash signature length
+LSH_BANDS = 16 # 16 bands x 4 rows: pairs at ~0.8 Jaccard collide with high probability
+CHARS_PER_TOKEN = 4 # Rough English/Hinglish estimate for savings reports
+PROMPT_OVERHEAD_CHARS = 16 # "ID: ", "Text: " and separators per review
+
+_MERSENNE = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+# a, b < 2^31 keep a * crc32 + b inside uint64
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, drop punctuation/emoji, squeeze repeats ("goooood!!" -> "good").
+    Combining marks (Unicode category M, e.g. Devanagari vowel signs) are letters' parts,
+    not punctuation, so they are kept. Emoji/punctuation-only text normalizes to "".
+    """
+    text = "".join(ch if ch.isalnum() or unicodedata.category(ch)[0] == "M" else " " for ch in text.lower())
+    text = re.sub(r"(.)\1{2,}", r"\1\1", text)
+    return " ".join(text.split())
+
+def _minhash(text: str) -> np.ndarray:
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    hashes = np.array([zlib.crc32(s.encode()) for s in shingles], dtype=np.uint64)
+    # (NUM_PERM, n_shingles) universal hashes; min over shingles per permutation
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE).min(axis=1)
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def dedupe_reviews(reviews: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Groups exact and near-duplicate reviews and keeps one representative per group.
+
+    Returns (representatives, stats). Each representative is a copy of the longest
+    review in its group with an added 'weight' = group size, so topic counts from the
+    LLM can be multiplied back up. stats reports reviews/tokens before and after
+    (tokens over the reviews long enough to keep), how many were too short, and the
+    token savings of deduplication and of the short prompt IDs separately.
+    Reviews with no words left after normalizing (emoji or punctuation only) count as
+    too short: they would otherwise all share the empty key and merge into one group.
+    """
+    kept, keys_of_kept = [], []
+    for r in reviews:
+        key = normalize_text(r['content'])
+        if key and len(r['content'].strip()) >= MIN_CONTENT_LENGTH:
+            kept.append(r)
+            keys_of_kept.append(key)
+
+    # 1. Exact duplicates on normalized text
+    groups = {} # normalized text -> [review, ...]
+    for r, key in zip(kept, keys_of_kept):
+        groups.setdefault(key, []).append(r)
+    keys = list(groups.keys())
+
+    # 2. Near duplicates: MinHash + LSH banding, merged with union-find
+    parent = list(range(len(keys)))
+    long_idx = [i for i, k in enumerate(keys) if len(k) >= NEAR_DUP_MIN_LENGTH]
+    if len(long_idx) > 1:
+        signatures = {i: _minhash(keys[i]) for i in long_idx}
+        rows = NUM_PERM // LSH_BANDS
+        for band in range(LSH_BANDS):
+            buckets = {}
+            for i in long_idx:
+                buckets.setdefault(signatures[i][band * rows:(band + 1) * rows].tobytes(), []).append(i)
+            for members in buckets.values():
+                for j in members[1:]:
+                    # Judge the colliding pair itself, so merges do not depend on earlier unions
+                    if (signatures[members[0]] == signatures[j]).mean() < NEAR_DUP_THRESHOLD:
+                        continue
+                    a, b = _find(parent, members[0]), _find(parent, j)
+                    if a != b:
+                        parent[b] = a
+
+    clusters = {}
+    for i, key in enumerate(keys):
+        clusters.setdefault(_find(parent, i), []).extend(groups[key])
+
+    representatives = []
+    for members in clusters.values():
+        rep = dict(max(members, key=lambda r: len(r['content'])))
+        rep['weight'] = len(members)
+        representatives.append(rep)
+
+    # Prompt chars per review: "ID: <id>\nText: <content>\n---\n". Before = every review
+    # with its UUID (the old prompt format); after = representatives with short IDs.
+    # Too-short reviews are reported separately, not as savings. Dedup savings are the
+    # dropped duplicates; ID savings are UUID -> positional ID on the representatives.
+    chars_in = sum(len(r['content']) + len(r['reviewId']) + PROMPT_OVERHEAD_CHARS for r in kept)
+    chars_deduped = sum(len(r['content']) + len(r['reviewId']) + PROMPT_OVERHEAD_CHARS for r in representatives)
+    chars_out = sum(len(r['content']) + 2 + PROMPT_OVERHEAD_CHARS for r in representatives)
+    stats = {
+        "reviews": len(reviews),
+        "too_short": len(reviews) - len(kept),
+        "sent": len(representatives),
+        "tokens_before": chars_in // CHARS_PER_TOKEN,
+        "tokens_after": chars_out // CHARS_PER_TOKEN,
+        "tokens_saved": (chars_in - chars_deduped) // CHARS_PER_TOKEN,
+        "tokens_saved_ids": (chars_deduped - chars_out) // CHARS_PER_TOKEN
+    }
+    return representatives, stats
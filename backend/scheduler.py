@@ -0,0 +1,116 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+# Groq free-tier limits per model: (requests/min, tokens/min)
+MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": (30, 12000),
+    "llama-3.1-8b-instant": (30, 6000),
+    "mixtral-8x7b-32768": (30, 5000),
+    "gemma2-9b-it": (30, 15000),
+}
+DEFAULT_LIMITS = (30, 6000)
+# Buckets are per process: with N server processes (uvicorn --workers N) each one gets 1/N
+# of every limit, so together they stay under the account's limits. Defaults to
+# WEB_CONCURRENCY, which uvicorn also reads as its worker count.
+RATE_LIMIT_WORKERS = int(os.environ.get("RATE_LIMIT_WORKERS", os.environ.get("WEB_CONCURRENCY", "1")))
+
+# --- 1. TOKEN BUCKET ---
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units/min."""
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0 # units per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` (may go negative) and returns how long to wait before using it."""
+        # Requests larger than the bucket could never fit; cap them so they wait one full window
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+# --- 2. PER-MODEL SCHEDULER ---
+class RateLimitScheduler:
+    """
+    Paces calls per model with request and token buckets, and honours Retry-After
+    by pausing a model until its window reopens. Each limit is divided by `workers`,
+    the number of processes sharing the same API key.
+    """
+    def __init__(self, limits: Dict[str, tuple] = None, workers: int = RATE_LIMIT_WORKERS):
+        self.limits = limits or MODEL_LIMITS
+        self.workers = max(1, workers)
+        self._buckets = {}
+        self._blocked_until = {}
+        self._lock = threading.Lock()
+
+    def _get_buckets(self, model: str):
+        with self._lock:
+            if model not in self._buckets:
+                rpm, tpm = self.limits.get(model, DEFAULT_LIMITS)
+                self._buckets[model] = (TokenBucket(rpm / self.workers), TokenBucket(tpm / self.workers))
+            return self._buckets[model]
+
+    def wait_time(self, model: str) -> float:
+        """Seconds until `model` is unblocked after a 429 (0 if available)."""
+        with self._lock:
+            return max(0.0, self._blocked_until.get(model, 0.0) - time.monotonic())
+
+    def acquire(self, model: str, est_tokens: int):
+        """Blocks until one request of ~`est_tokens` tokens may be sent to `model`."""
+        blocked = self.wait_time(model)
+        if blocked > 0:
+            time.sleep(blocked)
+
+        req_bucket, tok_bucket = self._get_buckets(model)
+        delay = max(req_bucket.reserve(1), tok_bucket.reserve(est_tokens))
+        if delay > 0:
+            time.sleep(delay)
+
+    def penalize(self, model: str, retry_after: float):
+        """Pauses every caller of `model` for `retry_after` seconds."""
+        with self._lock:
+            until = time.monotonic() + retry_after
+            self._blocked_until[model] = max(self._blocked_until.get(model, 0.0), until)
+
+# --- 3. RATE LIMIT ERROR HELPERS ---
+def is_rate_limit_error(e: Exception) -> bool:
+    if getattr(e, "status_code", None) == 429:
+        return True
+    err_str = str(e).lower()
+    return "429" in err_str or "rate limit" in err_str
+
+def get_retry_after(e: Exception) -> Optional[float]:
+    """
+    Reads the server's back-off hint from a 429: the Retry-After header if the client
+    exposes the response, else Groq's "Please try again in 7.5s" / "1m2.3s" message.
+    """
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+
+    match = re.search(r"try again in (?:(\d+)m)?([\d.]+)(ms|s)", str(e))
+    if match:
+        minutes, amount, unit = match.groups()
+        seconds = float(amount) / 1000 if unit == "ms" else float(amount)
+        return seconds + 60 * int(minutes or 0)
+    return None
+
+# --- Singleton Instance ---
+scheduler = RateLimitScheduler()
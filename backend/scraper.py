@@ -1,116 +1,149 @@
-import json
-import os
-import datetime
 from google_play_scraper import Sort, reviews, search
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Tuple, Union
+import metrics
+from store import APP_ID_ERROR_TTL, APP_ID_NOT_FOUND_TTL, ReviewStore, app_id_cache, review_store
 
-DATA_DIR = "data"
+MAX_PAGES = 200 # Safety break: pages walked per sync
+PAGE_SIZE = 200 # Reviews per Play Store page
 
 def search_app_id(app_name: str) -> str:
     """
     Searches for the app by name and returns the top result's appId.
+    Resolutions (including "not found" and failed searches, for a shorter time) are
+    cached in app_id_cache, seeded from app_ids.json.
     """
-    COMMON_APPS = {
-        "instagram": "com.instagram.android",
-        "insta": "com.instagram.android",
-        "swiggy": "in.swiggy.android",
-        "zomato": "com.application.zomato",
-        "uber": "com.ubercab",
-        "blinkit": "com.grofers.customerapp", 
-        "zepto": "com.zeptonow.customer",
-        "whatsapp": "com.whatsapp",
-        "snapchat": "com.snapchat.android",
-        "facebook": "com.facebook.katana",
-        "twitter": "com.twitter.android",
-        "x": "com.twitter.android",
-        "linkedin": "com.linkedin.android",
-        "youtube": "com.google.android.youtube",
-        "netflix": "com.netflix.mediaclient",
-        "spotify": "com.spotify.music"
-    }
-    
-    name_clean = app_name.lower().strip()
-    
-    # 1. Instant match = fastest + safest (bypasses network/throttling)
-    if name_clean in COMMON_APPS:
-        print(f"[SEARCH] Using hardcoded ID for '{app_name}': {COMMON_APPS[name_clean]}")
-        return COMMON_APPS[name_clean]
+    # 1. Cache hit = fastest + safest (bypasses network/throttling)
+    hit, app_id = app_id_cache.get(app_name)
+    metrics.inc("app_id_lookups_total", outcome="hit" if hit else "miss")
+    if hit:
+        print(f"[SEARCH] Cached ID for '{app_name}': {app_id or 'not found'}")
+        return app_id
         
     try:
         print(f"[SEARCH] Looking for app: '{app_name}' (Global)...")
         # 2. Global Search (No country restriction, higher n_hits)
-        results = search(
-            app_name,
-            n_hits=5
-        )
+        with metrics.span("search"):
+            results = search(
+                app_name,
+                n_hits=5
+            )
         if results:
             # Iterate to find the first valid appId (sometimes top result is None)
             for res in results:
                 if res['appId']:
                     print(f"[SEARCH] Found: {res['appId']}")
+                    app_id_cache.put(app_name, res['appId'])
                     return res['appId']
             
         print("[SEARCH] No valid results found globally.")
+        app_id_cache.put(app_name, None, ttl=APP_ID_NOT_FOUND_TTL)
         return None
         
     except Exception as e:
         print(f"[ERROR] App search failed: {e}")
+        app_id_cache.put(app_name, None, ttl=APP_ID_ERROR_TTL, source="error")
         return None
 
-def fetch_reviews_for_date_range(app_id: str, start_date_str: str, end_date_str: str) -> list:
+def iter_review_pages(app_id: str, max_pages: int = MAX_PAGES) -> Iterator[Tuple[list, bool]]:
     """
-    Fetches reviews for a given date range [start_date, end_date].
-    Returns a list of review dicts.
+    Walks the NEWEST-sorted review stream page by page, yielding (reviews, has_more).
+    Stops after the last page or `max_pages` pages; callers break out to stop earlier.
     """
-    start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-    end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-    
-    print(f"[FETCHING] Reviews for {app_id} from {start_date} to {end_date}...")
-    
-    all_reviews = []
     continuation_token = None
-    
-    # Safety break
-    MAX_QUERIES = 200
-    query_count = 0
-    done = False
-    
-    while not done and query_count < MAX_QUERIES:
-        result, continuation_token = reviews(
-            app_id,
-            lang='en',
-            country='in',
-            sort=Sort.NEWEST,
-            count=200,
-            continuation_token=continuation_token
-        )
-        query_count += 1
-        
-        if not result:
-            break
-            
+    for page_no in range(1, max_pages + 1):
+        with metrics.span("scrape_page", page=page_no) as page:
+            result, continuation_token = reviews(
+                app_id,
+                lang='en',
+                country='in',
+                sort=Sort.NEWEST,
+                count=PAGE_SIZE,
+                continuation_token=continuation_token
+            )
+            page.set(reviews=len(result))
+        metrics.inc("scraped_reviews_total", len(result))
+
+        has_more = bool(result) and continuation_token is not None
+        yield result, has_more
+        if not has_more:
+            return
+
+def normalize_dates(dates: List[Union[str, date]]) -> List[str]:
+    """
+    Returns the dates as zero-padded "YYYY-MM-DD" strings, in order. The sync window and
+    the caches compare dates as strings, so "2025-1-5" must become "2025-01-05".
+    Raises ValueError for anything that is not a calendar date.
+    """
+    return [d.isoformat() if isinstance(d, date) else datetime.strptime(d, "%Y-%m-%d").date().isoformat()
+            for d in dates]
+
+def sync_reviews_for_dates(app_id: str, date_strs: List[str], store: ReviewStore = None) -> Dict[str, list]:
+    """
+    Incrementally syncs the local review store for `app_id`, then serves the
+    requested dates from disk.
+
+    - If the requested dates fall inside the window already synced, only reviews
+      newer than the newest stored `at` timestamp are fetched.
+    - Otherwise the stream is walked (once) back to the oldest requested date.
+    Inserts are deduped on reviewId, so re-syncs are idempotent.
+    """
+    store = store or review_store
+    wanted_dates = sorted(set(normalize_dates(date_strs)))
+    if not wanted_dates:
+        return {}
+
+    oldest_requested = wanted_dates[0]
+    state = store.get_sync_state(app_id)
+    incremental = state is not None and oldest_requested >= state[1]
+
+    if incremental:
+        print(f"[SYNC] {app_id}: fetching reviews newer than {state[0]}...")
+    else:
+        print(f"[SYNC] {app_id}: walking reviews back to {oldest_requested}...")
+
+    fetched = []
+    complete = False
+    pages = 0
+
+    for result, has_more in iter_review_pages(app_id):
+        pages += 1
         for r in result:
-            review_date = r['at'].date()
-            
-            # Check if within range
-            if start_date <= review_date <= end_date:
-                all_reviews.append({
-                    'reviewId': r['reviewId'],
-                    'content': r['content'],
-                    'score': r['score'],
-                    'at': r['at'].isoformat(),
-                    'date': review_date.strftime("%Y-%m-%d") # Add date field for easier grouping
-                })
-            elif review_date < start_date:
-                # We went too far back
-                done = True
-                
-        # If the batch end is older than start_date, stop
-        if result and result[-1]['at'].date() < start_date:
-            done = True
-            
-    print(f"[DONE] Fetched {len(all_reviews)} reviews.")
-    return all_reviews
+            fetched.append({
+                'reviewId': r['reviewId'],
+                'content': r['content'],
+                'score': r['score'],
+                'at': r['at'].isoformat(),
+                'date': r['at'].date().strftime("%Y-%m-%d")
+            })
+
+        if not has_more:
+            complete = True
+            break
+        last = fetched[-1]
+        # Reviews sharing the newest stored second are re-fetched; dedup absorbs them
+        if incremental and last['at'] < state[0]:
+            complete = True
+            break
+        if not incremental and last['date'] < oldest_requested:
+            complete = True
+            break
+
+    added = store.add_reviews(app_id, fetched)
+
+    # Only advance the synced window when the walk was not cut short,
+    # otherwise the window would claim days that still have gaps.
+    if complete:
+        newest_at = fetched[0]['at'] if fetched else ""
+        if state and state[0] > newest_at:
+            newest_at = state[0]
+        oldest_date = state[1] if incremental else oldest_requested
+        store.update_sync_state(app_id, newest_at, oldest_date)
+    else:
+        print(f"[WARN] Sync for {app_id} stopped after {MAX_PAGES} pages; window not advanced.")
+
+    print(f"[SYNC] {app_id}: {len(fetched)} fetched, {added} new, {pages} page(s).")
+    return store.get_reviews_by_date(app_id, wanted_dates)
 
 if __name__ == "__main__":
     # Quick Test
@@ -120,6 +153,6 @@ if __name__ == "__main__":
     
     if app_id:
         today = datetime.now().strftime("%Y-%m-%d")
-        # Fetch just today/yesterday for test
-        res = fetch_reviews_for_date_range(app_id, today, today)
-        print(f"Fetched {len(res)} reviews for today.")
+        # Sync just today for test
+        res = sync_reviews_for_dates(app_id, [today])
+        print(f"Fetched {len(res[today])} reviews for today.")
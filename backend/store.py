@@ -0,0 +1,398 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+DATA_DIR = "data"
+REVIEW_DB_FILE = os.path.join(DATA_DIR, "reviews.db")
+APP_ID_SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_ids.json")
+APP_ID_CACHE_SIZE = 1024 # Names kept in memory (LRU); the table keeps everything
+APP_ID_TTL = 30 * 86400 # Seconds a resolved name is trusted (seeds never expire)
+APP_ID_NOT_FOUND_TTL = 3600 # Negative entry: the search found nothing
+APP_ID_ERROR_TTL = 60 # Negative entry: the search itself failed (throttled, offline)
+# Generic words that never tell apps apart ("Swiggy App" == "swiggy"). Domain words
+# ("food", "delivery") stay: "Food Network" and "Network" are different apps
+APP_NAME_STOPWORDS = {"the", "app", "apps", "official", "android"}
+
+# --- LOCAL REVIEW STORE (SQLite) ---
+class ReviewStore:
+    """
+    Persistent per-app review store keyed by (app_id, reviewId) and indexed by date.
+
+    sync_state tracks the contiguous window the scraper has fully walked for each app:
+    every review from `oldest_date` up to `newest_at` is on disk, so those days can be
+    served without touching the Play Store.
+    """
+    def __init__(self, db_path: str = REVIEW_DB_FILE):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reviews (
+                    app_id    TEXT NOT NULL,
+                    review_id TEXT NOT NULL,
+                    date      TEXT NOT NULL,
+                    at        TEXT NOT NULL,
+                    content   TEXT,
+                    score     INTEGER,
+                    PRIMARY KEY (app_id, review_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_reviews_app_date ON reviews (app_id, date);
+
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    app_id      TEXT PRIMARY KEY,
+                    newest_at   TEXT NOT NULL,
+                    oldest_date TEXT NOT NULL
+                );
+            """)
+
+    def add_reviews(self, app_id: str, reviews: List[Dict]) -> int:
+        """Inserts reviews, ignoring ones already stored (idempotent). Returns # of new rows."""
+        rows = [
+            (app_id, r['reviewId'], r['date'], r['at'], r['content'], r['score'])
+            for r in reviews
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO reviews (app_id, review_id, date, at, content, score) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def get_reviews_by_date(self, app_id: str, date_strs: List[str]) -> Dict[str, List[Dict]]:
+        """Returns {date_str: [review dicts]} (newest first) with an entry for every requested date."""
+        grouped = {d: [] for d in date_strs}
+        if not date_strs:
+            return grouped
+
+        placeholders = ",".join("?" for _ in grouped)
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT review_id, content, score, at, date FROM reviews "
+                f"WHERE app_id = ? AND date IN ({placeholders}) ORDER BY at DESC",
+                [app_id, *grouped.keys()]
+            )
+            for review_id, content, score, at, date in cur:
+                grouped[date].append({
+                    'reviewId': review_id,
+                    'content': content,
+                    'score': score,
+                    'at': at,
+                    'date': date
+                })
+        return grouped
+
+    def get_sync_state(self, app_id: str) -> Optional[Tuple[str, str]]:
+        """Returns (newest_at, oldest_date) for the app, or None if it was never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest_at, oldest_date FROM sync_state WHERE app_id = ?", (app_id,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def update_sync_state(self, app_id: str, newest_at: str, oldest_date: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sync_state (app_id, newest_at, oldest_date) VALUES (?, ?, ?) "
+                "ON CONFLICT(app_id) DO UPDATE SET newest_at = excluded.newest_at, "
+                "oldest_date = excluded.oldest_date",
+                (app_id, newest_at, oldest_date)
+            )
+
+    def is_day_complete(self, app_id: str, date_str: str) -> bool:
+        """
+        True if `date_str` is a finished past day that lies fully inside the synced window,
+        i.e. its reviews can no longer change.
+        """
+        state = self.get_sync_state(app_id)
+        if not state:
+            return False
+        newest_at, oldest_date = state
+        today = datetime.now().strftime("%Y-%m-%d")
+        return oldest_date <= date_str < newest_at[:10] and date_str < today
+
+# --- DAILY TOPIC COUNT CACHE ---
+class DailyTopicCache:
+    """
+    Durable cache of process_daily_batch results: {topic: count} per
+    (app_id, date, taxonomy_version). A new taxonomy version (edit/compaction)
+    makes older entries unreachable; `invalidate` purges them explicitly.
+    """
+    def __init__(self, db_path: str = REVIEW_DB_FILE):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_topic_counts (
+                    app_id           TEXT NOT NULL,
+                    date             TEXT NOT NULL,
+                    taxonomy_version TEXT NOT NULL,
+                    counts           TEXT NOT NULL,
+                    created_at       TEXT NOT NULL,
+                    PRIMARY KEY (app_id, date, taxonomy_version)
+                )
+            """)
+
+    def get(self, app_id: str, date_str: str, taxonomy_version: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT counts FROM daily_topic_counts "
+                "WHERE app_id = ? AND date = ? AND taxonomy_version = ?",
+                (app_id, date_str, taxonomy_version)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, app_id: str, date_str: str, taxonomy_version: str, counts: Dict[str, int]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO daily_topic_counts "
+                "(app_id, date, taxonomy_version, counts, created_at) VALUES (?, ?, ?, ?, ?)",
+                (app_id, date_str, taxonomy_version, json.dumps(counts), datetime.now().isoformat())
+            )
+
+    def topic_totals(self, taxonomy_version: str) -> Dict[str, int]:
+        """Total count per topic over every cached (app, date) under `taxonomy_version`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT counts FROM daily_topic_counts WHERE taxonomy_version = ?", (taxonomy_version,)
+            ).fetchall()
+        totals = {}
+        for (counts,) in rows:
+            for topic, count in json.loads(counts).items():
+                totals[topic] = totals.get(topic, 0) + count
+        return totals
+
+    def remap(self, old_version: str, new_version: str, aliases: Dict[str, str]) -> int:
+        """
+        Copies counts cached under `old_version` to `new_version`, renaming topics through
+        `aliases` ({alias: canonical}); counts of merged topics are summed. Saves recomputing
+        days after a compaction. Returns the number of (app, date) entries carried over.
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT app_id, date, counts FROM daily_topic_counts WHERE taxonomy_version = ?", (old_version,)
+            ).fetchall()
+            for app_id, date_str, counts in rows:
+                remapped = {}
+                for topic, count in json.loads(counts).items():
+                    topic = aliases.get(topic, topic)
+                    remapped[topic] = remapped.get(topic, 0) + count
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO daily_topic_counts "
+                    "(app_id, date, taxonomy_version, counts, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (app_id, date_str, new_version, json.dumps(remapped), datetime.now().isoformat())
+                )
+        return len(rows)
+
+    def invalidate(self, app_id: str = None, keep_version: str = None) -> int:
+        """
+        Deletes cached counts. Scope to one app with `app_id`; pass `keep_version`
+        to only drop entries computed under other taxonomy versions.
+        Returns the number of rows removed.
+        """
+        query = "DELETE FROM daily_topic_counts WHERE 1 = 1"
+        params = []
+        if app_id:
+            query += " AND app_id = ?"
+            params.append(app_id)
+        if keep_version:
+            query += " AND taxonomy_version != ?"
+            params.append(keep_version)
+        with self._lock, self._conn:
+            return self._conn.execute(query, params).rowcount
+
+# --- BACKGROUND JOB STATE ---
+class JobStore:
+    """
+    Status, partial per-day counts and results of background analysis jobs (jobs.py).
+    Kept in SQLite rather than process memory, so GET /jobs/{id} works from any worker,
+    not only the one that accepted the job.
+    """
+    def __init__(self, db_path: str = REVIEW_DB_FILE):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id      TEXT PRIMARY KEY,
+                    status      TEXT NOT NULL,
+                    app_name    TEXT NOT NULL,
+                    dates       TEXT NOT NULL,
+                    created_at  TEXT NOT NULL,
+                    finished_at REAL,
+                    partial     TEXT NOT NULL,
+                    result      TEXT,
+                    error       TEXT
+                )
+            """)
+
+    def create(self, job_id: str, app_name: str, dates: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, app_name, dates, created_at, partial) "
+                "VALUES (?, 'queued', ?, ?, ?, '{}')",
+                (job_id, app_name, json.dumps(dates), datetime.now().isoformat())
+            )
+
+    def update(self, job_id: str, status: str = None, partial: Dict[str, Dict[str, int]] = None,
+               result: Dict = None, error: str = None):
+        """Sets the given fields; a "done" or "failed" status also stamps finished_at."""
+        fields = {}
+        if status is not None:
+            fields["status"] = status
+            if status in ("done", "failed"):
+                fields["finished_at"] = time.time()
+        if partial is not None:
+            fields["partial"] = json.dumps(partial)
+        if result is not None:
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = error
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, app_name, dates, created_at, partial, result, error FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, app_name, dates, created_at, partial, result, error = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "app_name": app_name,
+            "dates": json.loads(dates),
+            "created_at": created_at,
+            "partial": json.loads(partial),
+            "result": json.loads(result) if result else None,
+            "error": error
+        }
+
+    def prune(self, max_age: float) -> int:
+        """Deletes jobs that finished more than `max_age` seconds ago. Returns the count."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - max_age,)
+            ).rowcount
+
+# --- APP ID RESOLUTION CACHE ---
+def normalize_app_name(app_name: str) -> str:
+    """Cache key for an app name: lowercase words, punctuation and generic words dropped."""
+    words = re.findall(r"[a-z0-9]+", app_name.lower())
+    key = " ".join(w for w in words if w not in APP_NAME_STOPWORDS)
+    return key or " ".join(words) or app_name.strip().lower()
+
+class AppIdCache:
+    """
+    Name -> Play Store appId, so repeat searches skip the network.
+
+    Entries live in the `app_ids` table (shared by workers, kept across restarts) behind
+    an in-memory LRU. A NULL app_id is a negative entry: the name is known not to resolve
+    until it expires. app_ids.json is seed data, loaded on start with no expiry.
+    """
+    def __init__(self, db_path: str = REVIEW_DB_FILE, seed_path: str = APP_ID_SEED_FILE,
+                 capacity: int = APP_ID_CACHE_SIZE):
+        self.db_path = db_path
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._lru = OrderedDict() # key -> (app_id, expires_at)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS app_ids (
+                    key         TEXT PRIMARY KEY,
+                    app_id      TEXT,
+                    source      TEXT NOT NULL,
+                    resolved_at REAL NOT NULL,
+                    expires_at  REAL
+                )
+            """)
+        if seed_path and os.path.exists(seed_path):
+            self.seed(seed_path)
+
+    def seed(self, path: str) -> int:
+        """Loads {name: appId} seed entries (replacing earlier seeds). Returns the count."""
+        with open(path, "r") as f:
+            seeds = json.load(f)
+        now = time.time()
+        rows = [(normalize_app_name(name), app_id, "seed", now, None) for name, app_id in seeds.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO app_ids (key, app_id, source, resolved_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._lru.clear()
+        return len(rows)
+
+    def get(self, app_name: str) -> Tuple[bool, Optional[str]]:
+        """(hit, app_id). A hit with app_id None is a cached "not found"."""
+        key = normalize_app_name(app_name)
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT app_id, expires_at FROM app_ids WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return False, None
+                entry = (row[0], row[1])
+                self._remember(key, entry)
+            else:
+                self._lru.move_to_end(key)
+            app_id, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._lru[key]
+                return False, None
+            return True, app_id
+
+    def put(self, app_name: str, app_id: Optional[str], ttl: float = APP_ID_TTL, source: str = "search"):
+        """Caches a resolution; pass app_id=None (with a short ttl) for a negative entry."""
+        key = normalize_app_name(app_name)
+        now = time.time()
+        entry = (app_id, now + ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO app_ids (key, app_id, source, resolved_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)", (key, app_id, source, now, entry[1])
+            )
+            self._remember(key, entry)
+
+    def _remember(self, key: str, entry: Tuple[Optional[str], Optional[float]]):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+# --- Singleton Instances ---
+review_store = ReviewStore()
+topic_cache = DailyTopicCache()
+app_id_cache = AppIdCache()
+job_store = JobStore()
@@ -0,0 +1,321 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+TAXONOMY_DB_FILE = "taxonomy.db"
+TAXONOMY_EMBEDDINGS_FILE = "taxonomy_embeddings.npy"
+BUSY_TIMEOUT_SECONDS = 30.0 # How long a writer waits for another process's write transaction
+
+# --- BINARY TAXONOMY PERSISTENCE ---
+class TaxonomyStore:
+    """
+    On-disk taxonomy: topic metadata in SQLite (row, name, examples, created_at) and
+    L2-normalized float32 embeddings in a .npy file whose row i belongs to topic row i.
+    Labelled review exemplars (used by the embedding fast path) live in SQLite too.
+
+    - load() memory-maps the embeddings, so startup does not parse floats.
+    - append() writes only new rows: vectors first (past the current header shape),
+      then the header, then the metadata commit. SQLite is the source of truth, so a
+      crash at any point leaves a consistent taxonomy.
+    - rewrite() replaces everything atomically (used for migration and compaction).
+
+    Several processes (uvicorn workers) can share one store. Every write runs inside
+    transaction(), which takes SQLite's write lock (BEGIN IMMEDIATE), so appends are
+    serialized across processes and the .npy file is only touched by the lock holder.
+    Version counters in `meta` let readers refresh cheaply (see get_versions):
+    `generation` grows on every write, `epoch` on every rewrite. Each epoch has its own
+    embeddings file, so a rewrite never changes rows under a reader of the old epoch.
+    """
+    def __init__(self, db_path: str = TAXONOMY_DB_FILE, embeddings_path: str = TAXONOMY_EMBEDDINGS_FILE):
+        self.db_path = db_path
+        self.base_embeddings_path = embeddings_path
+        # Autocommit mode: transactions are explicit (see transaction())
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=BUSY_TIMEOUT_SECONDS,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.RLock()
+        self._depth = 0
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS topics (
+                    row        INTEGER PRIMARY KEY,
+                    name       TEXT NOT NULL UNIQUE,
+                    examples   TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS examples (
+                    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                    topic     TEXT,          -- NULL: the LLM found no topic in this review
+                    embedding BLOB NOT NULL  -- normalized float32 review embedding
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key   TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS merges (
+                    alias      TEXT PRIMARY KEY, -- Former topic, merged by compaction
+                    canonical  TEXT NOT NULL,    -- Topic it was merged into (kept current)
+                    similarity REAL NOT NULL,
+                    embedding  BLOB NOT NULL,    -- Alias embedding, so its phrasings keep mapping
+                    merged_at  TEXT NOT NULL
+                );
+            """)
+
+    @contextmanager
+    def transaction(self, write: bool = True):
+        """
+        Runs the block in one SQLite transaction. write=True takes the database write lock
+        up front (BEGIN IMMEDIATE), serializing writers across threads and processes;
+        write=False gives a consistent read snapshot. Nested calls join the outer one.
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
+
+    def names(self) -> set:
+        with self._lock:
+            return {name for (name,) in self._conn.execute("SELECT name FROM topics")}
+
+    def get_versions(self) -> Tuple[int, int, int]:
+        """(epoch, generation, revision) in one query; cheap enough to call before every mapping."""
+        with self._lock:
+            values = dict(self._conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('epoch', 'generation', 'revision')"
+            ).fetchall())
+        return int(values.get("epoch", 0)), int(values.get("generation", 0)), int(values.get("revision", 0))
+
+    @property
+    def embeddings_path(self) -> str:
+        return self._embeddings_path(int(self.get_meta("epoch", "0")))
+
+    def _embeddings_path(self, epoch: int) -> str:
+        if epoch == 0:
+            return self.base_embeddings_path
+        root, ext = os.path.splitext(self.base_embeddings_path)
+        return f"{root}.{epoch}{ext}"
+
+    def load(self) -> Tuple[List[Dict], Optional[np.ndarray]]:
+        """
+        Returns (topics, embeddings) where topics are ordered by row
+        ({name, examples, created_at}) and embeddings is a read-only memmap (or None).
+        """
+        return self.load_since(0)
+
+    def load_since(self, start: int) -> Tuple[List[Dict], Optional[np.ndarray]]:
+        """Like load(), for rows >= start only (topics another process appended)."""
+        with self.transaction(write=False):
+            rows = self._conn.execute(
+                "SELECT name, examples, created_at FROM topics WHERE row >= ? ORDER BY row", (start,)
+            ).fetchall()
+            embeddings_path = self.embeddings_path
+        topics = [
+            {"name": name, "examples": json.loads(examples), "created_at": created_at}
+            for name, examples, created_at in rows
+        ]
+        if not topics:
+            return [], None
+
+        embeddings = np.load(embeddings_path, mmap_mode="r")
+        end = start + len(topics)
+        if embeddings.shape[0] < end:
+            raise RuntimeError(
+                f"{embeddings_path} has {embeddings.shape[0]} rows but {self.db_path} has {end} topics"
+            )
+        # Rows past the metadata count belong to an interrupted (or uncommitted) append; ignore them
+        return topics, embeddings[start:end]
+
+    def append(self, topics: List[Dict], vectors: np.ndarray) -> int:
+        """
+        Appends new topics ({name, examples, created_at}) with their normalized vectors.
+        Returns the row of the first one. Call inside transaction() after checking names,
+        so the caller's view of existing rows cannot go stale before the insert.
+        """
+        if not topics:
+            return self.count()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self.transaction():
+            start = self.count()
+            embeddings_path = self.embeddings_path
+            if start == 0 or not os.path.exists(embeddings_path):
+                self._write_embeddings(embeddings_path, vectors)
+            else:
+                self._append_embeddings(embeddings_path, start, vectors)
+
+            # name is UNIQUE, so a duplicate raises and the whole append rolls back
+            self._conn.executemany(
+                "INSERT INTO topics (row, name, examples, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (start + i, t["name"], json.dumps(t["examples"]), t["created_at"])
+                    for i, t in enumerate(topics)
+                ]
+            )
+            self._increment_meta("generation")
+        return start
+
+    def rewrite(self, topics: List[Dict], vectors: np.ndarray):
+        """
+        Atomically replaces the whole taxonomy. The embeddings go to a new per-epoch file,
+        so readers of the previous epoch keep a consistent view until they refresh.
+        """
+        with self.transaction():
+            epoch = self._increment_meta("epoch")
+            self._write_embeddings(self._embeddings_path(epoch), np.ascontiguousarray(vectors, dtype=np.float32))
+            self._conn.execute("DELETE FROM topics")
+            self._conn.executemany(
+                "INSERT INTO topics (row, name, examples, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (i, t["name"], json.dumps(t["examples"]), t["created_at"])
+                    for i, t in enumerate(topics)
+                ]
+            )
+            self._increment_meta("generation")
+        self._remove_stale_embeddings(epoch)
+
+    def merge_topics(self, topics: List[Dict], vectors: np.ndarray,
+                     merges: Dict[str, Tuple[str, float]], alias_vectors: np.ndarray, merged_at: str):
+        """
+        Applies a compaction in one transaction: rewrites the taxonomy to the kept `topics`,
+        records {alias: (canonical, similarity)} (re-pointing older aliases of a merged topic),
+        and relabels exemplars of merged topics.
+        """
+        with self.transaction():
+            self.rewrite(topics, vectors)
+            for (alias, (canonical, similarity)), vector in zip(merges.items(), alias_vectors):
+                self._conn.execute("UPDATE merges SET canonical = ? WHERE canonical = ?", (canonical, alias))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO merges (alias, canonical, similarity, embedding, merged_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (alias, canonical, float(similarity), np.asarray(vector, dtype=np.float32).tobytes(), merged_at)
+                )
+                self._conn.execute("UPDATE examples SET topic = ? WHERE topic = ?", (canonical, alias))
+
+    def load_merges(self) -> Tuple[List[str], List[str], Optional[np.ndarray]]:
+        """Returns (aliases, canonical topic per alias, (n, dim) alias embeddings)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT alias, canonical, embedding FROM merges ORDER BY alias").fetchall()
+        if not rows:
+            return [], [], None
+        vectors = np.vstack([np.frombuffer(emb, dtype=np.float32) for _, _, emb in rows])
+        return [a for a, _, _ in rows], [c for _, c, _ in rows], vectors
+
+    def load_examples(self, after_id: int = 0) -> Tuple[List[Optional[str]], Optional[np.ndarray], int]:
+        """
+        Returns (topic per example, (n, dim) float32 embeddings, last id) for labelled
+        review exemplars with id > after_id.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, topic, embedding FROM examples WHERE id > ? ORDER BY id", (after_id,)
+            ).fetchall()
+        if not rows:
+            return [], None, after_id
+        vectors = np.vstack([np.frombuffer(emb, dtype=np.float32) for _, _, emb in rows])
+        return [topic for _, topic, _ in rows], vectors, rows[-1][0]
+
+    def append_examples(self, topics: List[Optional[str]], vectors: np.ndarray):
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT INTO examples (topic, embedding) VALUES (?, ?)",
+                [(t, np.asarray(v, dtype=np.float32).tobytes()) for t, v in zip(topics, vectors)]
+            )
+            self._increment_meta("generation")
+
+    def get_meta(self, key: str, default: str = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        with self.transaction():
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def increment_meta(self, key: str) -> int:
+        """Atomically increments an integer meta counter (across processes); returns the new value."""
+        with self.transaction():
+            return self._increment_meta(key)
+
+    def _increment_meta(self, key: str) -> int:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (key,)
+        )
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0])
+
+    # --- .npy helpers ---
+    def _remove_stale_embeddings(self, epoch: int):
+        """Deletes embeddings files older than the previous epoch (which slow readers may still open)."""
+        root, ext = os.path.splitext(self.base_embeddings_path)
+        for path in [self.base_embeddings_path] + glob.glob(f"{root}.*{ext}"):
+            suffix = path[len(root) + 1:-len(ext)] if path != self.base_embeddings_path else "0"
+            if suffix.isdigit() and int(suffix) < epoch - 1:
+                os.remove(path)
+
+    def _write_embeddings(self, path: str, vectors: np.ndarray):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, vectors)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _append_embeddings(self, path: str, start: int, vectors: np.ndarray):
+        """Writes rows [start, start + n) in place and grows the header's shape."""
+        with open(path, "r+b") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            header_len = f.tell()
+            if dtype != np.float32 or fortran_order or shape[1] != vectors.shape[1]:
+                raise RuntimeError(f"Unexpected layout in {path}: {shape} {dtype}")
+
+            # 1. Data past the current shape is invisible to readers until the header grows
+            f.seek(header_len + start * vectors.shape[1] * 4)
+            f.write(vectors.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+            # 2. Grow the header in place (numpy pads it for growth along axis 0)
+            f.seek(0)
+            header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                      "shape": (start + len(vectors), shape[1])}
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(f, header)
+            else:
+                np.lib.format.write_array_header_2_0(f, header)
+            if f.tell() != header_len:
+                raise RuntimeError(f"Header of {path} changed size; rewrite required")
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,7 +1,6 @@
 "use client"
 
 import { useState } from 'react';
-import axios from 'axios';
 import { Search, Loader2, Zap, Flame, Download } from 'lucide-react';
 import TrendChart from '@/components/TrendChart';
 import InsightPanel from '@/components/InsightPanel';
@@ -16,6 +15,11 @@ interface AnalysisResult {
   insights: string;
 }
 
+type StreamEvent =
+  | ({ type: 'day'; date: string; counts: Record<string, number> } & Omit<AnalysisResult, 'insights'>)
+  | { type: 'done'; result: AnalysisResult }
+  | { type: 'error'; status: number; detail: string };
+
 export default function Home() {
   const [appName, setAppName] = useState('Instagram');
   const [dates, setDates] = useState(() => {
@@ -51,13 +55,41 @@ export default function Home() {
         return;
       }
 
-      const resp = await axios.post(`${apiUrl}/analyze`, {
-        app_name: appName,
-        dates: dates
+      // Stream one event per finished day so the chart fills in as the backend works
+      const resp = await fetch(`${apiUrl}/analyze/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ app_name: appName, dates: dates })
       });
-      setResult(resp.data);
+      if (!resp.ok || !resp.body) {
+        throw new Error('Analysis failed. Make sure Backend is running.');
+      }
+
+      const reader = resp.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event: StreamEvent = JSON.parse(line);
+          if (event.type === 'day') {
+            setResult({ ...event, insights: '' });
+          } else if (event.type === 'done') {
+            setResult(event.result);
+          } else if (event.type === 'error') {
+            throw new Error(event.detail);
+          }
+        }
+      }
     } catch (err: any) {
-      setError(err.response?.data?.detail || 'Analysis failed. Make sure Backend is running.');
+      setError(err.message || 'Analysis failed. Make sure Backend is running.');
     } finally {
       setLoading(false);
     }